@@ -2,16 +2,27 @@
 AI-based Japanese to English Translation
 複数のAI翻訳エンジンに対応
 """
+import os
+
 import requests
 import json
 from typing import Optional
 
+import tracing
+from metrics import TRANSLATE_FALLBACKS, TRANSLATE_LATENCY, TRANSLATE_REQUESTS, timed
+from resilience import call_protected, default_deadline
+
 class AITranslator:
     """AI翻訳エンジン（複数対応）"""
 
-    def __init__(self, translator_type="mock", api_key=None):
+    def __init__(self, translator_type="mock", api_key=None, timeout: Optional[float] = None):
         self.translator_type = translator_type
         self.api_key = api_key
+        # HTTP タイムアウト（None の場合は QUIZ_TRANSLATE_TIMEOUT_S、未設定なら翻訳の期限と同じ）
+        self.timeout = timeout or float(os.environ.get('QUIZ_TRANSLATE_TIMEOUT_S', default_deadline()))
+        # スタブサーバーなどに向けるための接続先（QUIZ_OPENAI_API_BASE / QUIZ_GOOGLE_API_BASE）
+        self.openai_api_base = os.environ.get('QUIZ_OPENAI_API_BASE', 'https://api.openai.com/v1')
+        self.google_api_base = os.environ.get('QUIZ_GOOGLE_API_BASE', 'https://translation.googleapis.com')
 
         if translator_type == "openai" and api_key:
             print("[OPENAI] Initializing GPT translation engine")
@@ -20,9 +31,23 @@ class AITranslator:
         else:
             print("[MOCK] Using mock translation engine (demo version)")
 
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        if self.translator_type == "openai" and self.api_key:
+            return ('openai', self.openai_api_base)
+        if self.translator_type == "google" and self.api_key:
+            return ('google_api', self.google_api_base)
+        return ('mock',)
+
     def translate(self, japanese_text: str) -> str:
         """日本語を英語に翻訳"""
+        backend = self.translator_type if self.api_key else "mock"
+        TRANSLATE_REQUESTS.labels(backend).inc()
+        with TRANSLATE_LATENCY.labels(backend).time(), tracing.span(f'translate.{backend}'):
+            return self._translate(japanese_text)
 
+    def _translate(self, japanese_text: str) -> str:
         if self.translator_type == "openai" and self.api_key:
             return self._translate_with_openai(japanese_text)
         elif self.translator_type == "google" and self.api_key:
@@ -31,80 +56,73 @@ class AITranslator:
             return self._translate_with_mock(japanese_text)
 
     def _translate_with_openai(self, text: str) -> str:
-        """OpenAI GPTで翻訳"""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
+        """OpenAI GPTで翻訳（ブレーカー・期限付き、失敗時はモック翻訳）"""
+        return call_protected('openai', self._request_openai, text,
+                              fallback=lambda: self._translate_with_mock(text))
+
+    def _request_openai(self, text: str) -> str:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
 
-            data = {
-                "model": "gpt-3.5-turbo",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a professional Japanese to English translator. Translate the given Japanese text into natural English. Only return the English translation, no explanations."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Translate this Japanese text to English: {text}"
-                    }
-                ],
-                "max_tokens": 200,
-                "temperature": 0.3
-            }
+        data = {
+            "model": "gpt-3.5-turbo",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a professional Japanese to English translator. Translate the given Japanese text into natural English. Only return the English translation, no explanations."
+                },
+                {
+                    "role": "user",
+                    "content": f"Translate this Japanese text to English: {text}"
+                }
+            ],
+            "max_tokens": 200,
+            "temperature": 0.3
+        }
 
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+        response = requests.post(
+            f"{self.openai_api_base}/chat/completions",
+            headers=headers,
+            json=data,
+            timeout=self.timeout
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                translation = result['choices'][0]['message']['content'].strip()
-                return translation
-            else:
-                print(f"OpenAI API エラー: {response.status_code}")
-                return self._translate_with_mock(text)
-
-        except Exception as e:
-            print(f"OpenAI翻訳エラー: {e}")
-            return self._translate_with_mock(text)
+        if response.status_code != 200:
+            raise RuntimeError(f"OpenAI API エラー: {response.status_code}")
+        result = response.json()
+        return result['choices'][0]['message']['content'].strip()
 
     def _translate_with_google(self, text: str) -> str:
-        """Google Translate APIで翻訳"""
-        try:
-            url = f"https://translation.googleapis.com/language/translate/v2?key={self.api_key}"
-
-            data = {
-                'q': text,
-                'source': 'ja',
-                'target': 'en',
-                'format': 'text'
-            }
+        """Google Translate APIで翻訳（ブレーカー・期限付き、失敗時はモック翻訳）"""
+        return call_protected('google_api', self._request_google, text,
+                              fallback=lambda: self._translate_with_mock(text))
+
+    def _request_google(self, text: str) -> str:
+        url = f"{self.google_api_base}/language/translate/v2?key={self.api_key}"
+
+        data = {
+            'q': text,
+            'source': 'ja',
+            'target': 'en',
+            'format': 'text'
+        }
 
-            response = requests.post(url, data=data, timeout=30)
+        response = requests.post(url, data=data, timeout=self.timeout)
 
-            if response.status_code == 200:
-                result = response.json()
-                translation = result['data']['translations'][0]['translatedText']
-                return translation
-            else:
-                print(f"Google Translate API エラー: {response.status_code}")
-                return self._translate_with_mock(text)
-
-        except Exception as e:
-            print(f"Google翻訳エラー: {e}")
-            return self._translate_with_mock(text)
+        if response.status_code != 200:
+            raise RuntimeError(f"Google Translate API エラー: {response.status_code}")
+        result = response.json()
+        return result['data']['translations'][0]['translatedText']
 
     def _translate_with_mock(self, text: str) -> str:
         """モック翻訳（改善版）"""
-        # 既存の翻訳ロジックを使用
+        if self.translator_type != "mock" and self.api_key:
+            TRANSLATE_FALLBACKS.labels(self.translator_type).inc()
+        # 既存の翻訳ロジックを使用（システム全体は初期化しない）
         from japanese_to_english_system import JapaneseToEnglishSystem
-        mock_system = JapaneseToEnglishSystem()
-        return mock_system.translate_japanese_to_english_mock(text)
+        return JapaneseToEnglishSystem.translate_japanese_to_english_mock(text)
 
 
 class LocalAITranslator:
@@ -138,6 +156,12 @@ class LocalAITranslator:
             print(f"[WARNING] Failed to initialize MarianMT translation model: {e}")
             self.available = False
 
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        return ('marian', self.available)
+
+    @timed(TRANSLATE_LATENCY.labels('marian'), TRANSLATE_REQUESTS.labels('marian'))
     def translate(self, japanese_text: str) -> str:
         """MarianMTで高品質AI翻訳"""
         if not self.available:
@@ -189,11 +213,12 @@ class LocalAITranslator:
                 return self._fallback_translation(japanese_text)
 
         except Exception as e:
-            print(f"AI翻訳エラー: {e}")
+            tracing.warning("AI翻訳エラー: %s", e)
             return self._fallback_translation(japanese_text)
 
     def _fallback_translation(self, text: str) -> str:
         """フォールバック: 簡単な翻訳"""
+        TRANSLATE_FALLBACKS.labels('marian').inc()
         # 循環インポートを避けるため、基本的な翻訳パターンを内蔵
         basic_translations = {
             "人工知能": "artificial intelligence",
@@ -0,0 +1,313 @@
+"""
+Offline Benchmark Suite
+採点・翻訳のホットパスをオフラインで計測するベンチマーク
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --iterations 500 --corpus-size 200 --seed 7
+
+結果は JSON で出力されるため、コミット間で比較できます。
+ネットワークには一切アクセスしません（フォールバック辞書のみ使用）。
+"""
+import argparse
+import contextlib
+import gc
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from result_memo import RESULT_MEMO
+from single_flight import ENCODE_FLIGHTS, TRANSLATE_FLIGHTS
+from stage_timings import percentile
+
+# インポート時の初期化ログも JSON 出力に混ざらないよう stderr に逃がす
+with contextlib.redirect_stdout(sys.stderr):
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+# 合成回答コーパス生成で使う置換候補（言い換え・表記揺れ）
+_PARAPHRASES = {
+    "私たち": ["私達", "我々"],
+    "生活": ["暮らし"],
+    "人工知能": ["AI"],
+    "向上させる": ["良くする", "改善する"],
+    "必要があります": ["必要です"],
+    "しています": ["している", "します"],
+    "です。": ["だ。", "です"],
+    "ます。": ["る。", "ます"],
+    "公園": ["こうえん"],
+    "新しい": ["新たな"],
+}
+
+_FILLERS = ["とても", "たぶん", "実は", "本当に", "ちょっと"]
+
+
+def generate_answer_corpus(questions: List[Dict], size: int, seed: int = 0) -> List[Dict]:
+    """問題バンクを元に合成回答コーパスを生成（seed で再現可能）"""
+    rng = random.Random(seed)
+    corpus = []
+
+    for i in range(size):
+        question = questions[i % len(questions)]
+        answer = question['japanese']
+        kind = rng.choice(['exact', 'paraphrase', 'truncate', 'filler', 'mixed', 'unrelated'])
+
+        if kind == 'paraphrase':
+            for jp, alternatives in _PARAPHRASES.items():
+                if jp in answer and rng.random() < 0.7:
+                    answer = answer.replace(jp, rng.choice(alternatives))
+        elif kind == 'truncate':
+            cut = rng.randint(max(1, len(answer) // 3), len(answer))
+            answer = answer[:cut]
+        elif kind == 'filler':
+            pos = rng.randint(0, len(answer))
+            answer = answer[:pos] + rng.choice(_FILLERS) + answer[pos:]
+        elif kind == 'mixed':
+            other = rng.choice(questions)['japanese']
+            answer = answer[:len(answer) // 2] + other[len(other) // 2:]
+        elif kind == 'unrelated':
+            answer = rng.choice(questions)['japanese']
+
+        corpus.append({
+            'question_id': question['id'],
+            'question': question,
+            'answer': answer,
+            'kind': kind,
+        })
+
+    return corpus
+
+
+def peak_rss_mb() -> float:
+    """プロセスのピークRSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は bytes で返す
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def summarize_latencies(latencies: List[float], items_per_call: int = 1) -> Dict:
+    """レイテンシ（秒）のリストから統計を作成"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        'calls': len(ordered),
+        'throughput_per_s': (len(ordered) * items_per_call / total) if total > 0 else 0.0,
+        'mean_ms': (total / len(ordered) * 1000) if ordered else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'max_ms': (ordered[-1] * 1000) if ordered else 0.0,
+    }
+
+
+def run_case(func: Callable[[int], object], iterations: int, warmup: int = 5,
+             items_per_call: int = 1) -> Dict:
+    """1ケースを計測（func はイテレーション番号を受け取る）"""
+    for i in range(warmup):
+        func(i)
+
+    gc.collect()
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - start)
+
+    result = summarize_latencies(latencies, items_per_call)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def measure_cascade_agreement(system: JapaneseToEnglishSystem, corpus: List[Dict]) -> Dict:
+    """cascade 採点と full 採点のグレード一致率・指標省略率・速度を比較"""
+    original_mode = system.scoring_mode
+    pairs = [
+        (system.translate_japanese_to_english_mock(item['answer']), item['question']['english_reference'])
+        for item in corpus
+    ]
+
+    outcomes = {}
+    for mode in ('full', 'cascade'):
+        system.scoring_mode = mode
+        latencies, results = [], []
+        for translated, reference in pairs:
+            start = time.perf_counter()
+            results.append(system.calculate_english_similarity(translated, reference))
+            latencies.append(time.perf_counter() - start)
+        outcomes[mode] = (results, summarize_latencies(latencies))
+    system.scoring_mode = original_mode
+
+    full_results, full_stats = outcomes['full']
+    cascade_results, cascade_stats = outcomes['cascade']
+
+    agree = 0
+    abs_diff = 0.0
+    skipped = {}
+    for full, cascade in zip(full_results, cascade_results):
+        full_score = int(full['final_score'] * 100)
+        cascade_score = int(cascade['final_score'] * 100)
+        if system._grade_for_score(full_score)[0] == system._grade_for_score(cascade_score)[0]:
+            agree += 1
+        abs_diff += abs(full_score - cascade_score)
+        for name in cascade['skipped_metrics']:
+            skipped[name] = skipped.get(name, 0) + 1
+
+    n = len(pairs)
+    return {
+        'pairs': n,
+        'grade_agreement': agree / n if n else 1.0,
+        'mean_abs_score_diff': abs_diff / n if n else 0.0,
+        'skip_rate': {name: count / n for name, count in skipped.items()},
+        'vector_bounds': list(system.cascade_vector_bounds),
+        'full': full_stats,
+        'cascade': cascade_stats,
+    }
+
+
+def run_benchmarks(iterations: int = 200, corpus_size: int = 100, seed: int = 0,
+                   batch_sizes: Optional[List[int]] = None) -> Dict:
+    """全ベンチマークを実行して結果を返す"""
+    batch_sizes = batch_sizes or [1, 4, 16, 32]
+
+    system = JapaneseToEnglishSystem()
+    corpus = generate_answer_corpus(system.sample_questions, corpus_size, seed)
+
+    # 翻訳結果はコーパスごとに事前計算（類似度ケースで翻訳コストを除外するため）
+    translated = [system.translate_japanese_to_english_mock(item['answer']) for item in corpus]
+    references = [item['question']['english_reference'] for item in corpus]
+    cleaned = [
+        (system._clean_english_text(t), system._clean_english_text(r))
+        for t, r in zip(translated, references)
+    ]
+
+    def pick(i):
+        return i % len(corpus)
+
+    cases = {}
+
+    # calculate_english_similarity の各指標を個別に計測
+    cases['similarity.word'] = run_case(
+        lambda i: system._calculate_word_similarity(*cleaned[pick(i)]), iterations)
+    cases['similarity.string'] = run_case(
+        lambda i: system._calculate_string_similarity(*cleaned[pick(i)]), iterations)
+    cases['similarity.structure'] = run_case(
+        lambda i: system._calculate_structure_similarity(*cleaned[pick(i)]), iterations)
+    cases['similarity.clean'] = run_case(
+        lambda i: system._clean_english_text(translated[pick(i)]), iterations)
+
+    if system.use_embeddings:
+        cases['similarity.vector'] = run_case(
+            lambda i: system.embeddings.calculate_similarity(*cleaned[pick(i)]), iterations)
+    else:
+        cases['similarity.vector'] = {'skipped': 'embedding model not available'}
+
+    cases['similarity.total'] = run_case(
+        lambda i: system.calculate_english_similarity(translated[pick(i)], references[pick(i)]),
+        iterations)
+
+    # 翻訳
+    cases['translate.mock'] = run_case(
+        lambda i: system.translate_japanese_to_english_mock(corpus[pick(i)]['answer']), iterations)
+
+    if system.translator is not None and hasattr(system.translator, '_fallback_translation'):
+        cases['translate.google_fallback'] = run_case(
+            lambda i: system.translator._fallback_translation(corpus[pick(i)]['answer']), iterations)
+    else:
+        cases['translate.google_fallback'] = {'skipped': 'GoogleTranslator not available'}
+
+    # 埋め込み（バッチサイズ別）
+    for batch_size in batch_sizes:
+        name = f'embeddings.encode.batch{batch_size}'
+        if not system.use_embeddings:
+            cases[name] = {'skipped': 'embedding model not available'}
+            continue
+
+        def encode_batch(i, batch_size=batch_size):
+            start = (i * batch_size) % len(cleaned)
+            texts = [cleaned[(start + j) % len(cleaned)][0] for j in range(batch_size)]
+            return system.embeddings.encode(texts)
+
+        cases[name] = run_case(encode_batch, max(1, iterations // batch_size),
+                               items_per_call=batch_size)
+
+    # エンドツーエンド採点（履歴が伸び続けないようにクリア）
+    def score(i):
+        item = corpus[pick(i)]
+        system.current_question = item['question']
+        result = system.score_translation(item['answer'])
+        system.score_history.clear()
+        return result
+
+    # 小さいコーパスを巡回すると大半が結果メモのヒットになるため、
+    # end_to_end はメモを無効にして計測し（従来の数値と比較可能）、ヒット時は別ケースで計測
+    memo_size = RESULT_MEMO.max_entries
+    RESULT_MEMO.max_entries = 0
+    try:
+        cases['score_translation.end_to_end'] = run_case(score, iterations)
+    finally:
+        RESULT_MEMO.max_entries = memo_size
+    for i in range(len(corpus)):
+        score(i)
+    # メモに載った回答だけを巡回（軽くした段階の結果などは保存されない）
+    memoized = [i for i in range(len(corpus)) if score(i).get('memo_hit')]
+    if memoized:
+        cases['score_translation.memo_hit'] = run_case(
+            lambda i: score(memoized[i % len(memoized)]), iterations)
+    else:
+        cases['score_translation.memo_hit'] = {'skipped': 'result memo disabled or nothing memoized'}
+
+    agreement = measure_cascade_agreement(system, corpus)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'corpus_size': corpus_size,
+            'seed': seed,
+            'ai_mode': system.use_embeddings,
+            'scoring_mode': system.scoring_mode,
+            'translator': type(system.translator).__name__ if system.translator else None,
+        },
+        'cases': cases,
+        'cascade_agreement': agreement,
+        'result_memo': RESULT_MEMO.stats(),
+        'single_flight': {'translate': TRANSLATE_FLIGHTS.stats(), 'encode': ENCODE_FLIGHTS.stats()},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark for scoring and translation hot paths")
+    parser.add_argument('--iterations', type=int, default=200, help="計測回数（ケースごと）")
+    parser.add_argument('--corpus-size', type=int, default=100, help="合成回答コーパスの件数")
+    parser.add_argument('--seed', type=int, default=0, help="コーパス生成の乱数シード")
+    parser.add_argument('--batch-sizes', type=str, default="1,4,16,32",
+                        help="encode のバッチサイズ（カンマ区切り）")
+    parser.add_argument('--output', type=str, default=None, help="JSON の出力先（省略時は標準出力）")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b.strip()]
+    # 計測中のログが JSON 出力に混ざらないよう stderr に逃がす
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args.iterations, args.corpus_size, args.seed, batch_sizes)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"[BENCHMARK] Results written to {args.output}")
+    else:
+        print(payload)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
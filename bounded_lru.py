@@ -0,0 +1,86 @@
+"""
+Bounded LRU Cache
+上限付きLRUキャッシュ（ヒット・ミス・追い出し件数を計測）
+
+採点結果メモやトークナイズ結果のキャッシュなど、プロセス内で共有するキャッシュの共通部分です。
+max_entries=0 で無効化できます（get は常に None、put は何もしない）。
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter(
+    'quiz_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+CACHE_ENTRIES = REGISTRY.gauge(
+    'quiz_cache_entries', 'Entries currently held by each cache', ['cache'])
+
+
+class BoundedLRU:
+    """スレッドセーフな上限付きLRU（name ごとにヒット・ミスと件数をメトリクスに記録）"""
+
+    def __init__(self, max_entries: int, name: str):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_counter = CACHE_REQUESTS.labels(name, 'hit')
+        self._miss_counter = CACHE_REQUESTS.labels(name, 'miss')
+        self._size_gauge = CACHE_ENTRIES.labels(name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        (self._miss_counter if entry is None else self._hit_counter).inc()
+        return entry
+
+    def put(self, key: Hashable, entry: object):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            size = len(self._entries)
+        self._size_gauge.set(size)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._size_gauge.set(0)
@@ -0,0 +1,244 @@
+"""
+Backend Comparison Report
+翻訳器 × 類似度バックエンドの組み合わせごとに、速度・メモリと採点結果のずれを比較する
+
+同じ合成回答コーパスを利用可能なすべての組み合わせで採点し、組み合わせごとの
+レイテンシ（翻訳・類似度・合計）とメモリ増分を、基準の組み合わせに対する
+スコア差・グレード一致率・順位相関（Spearman）と並べて JSON で出力します。
+
+Usage:
+    python compare_backends.py --output compare.json
+    python compare_backends.py --translators mock,google,marian --similarity none,static,distilbert \\
+        --baseline marian:distilbert --corpus-size 200
+
+翻訳器: mock（辞書ベースのフォールバック）/ google（googletrans）/ marian（LocalAITranslator）/
+        openai, google_api（AITranslator、OPENAI_API_KEY / GOOGLE_API_KEY が必要）
+類似度: none（字句指標のみ）/ static（静的単語ベクトル）/ distilbert
+読み込めない組み合わせは理由付きで skipped として記録します。
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmark import generate_answer_corpus
+from load_test import rss_mb
+from stage_timings import percentile
+
+with contextlib.redirect_stdout(sys.stderr):
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+TRANSLATORS = ('mock', 'google', 'marian', 'openai', 'google_api')
+SIMILARITY_BACKENDS = ('none', 'static', 'distilbert')
+
+
+def load_translator(name: str) -> Callable[[str], str]:
+    """翻訳器を読み込み translate 関数を返す（使えなければ RuntimeError）"""
+    if name == 'mock':
+        return JapaneseToEnglishSystem.translate_japanese_to_english_mock
+    if name == 'google':
+        from google_translator import GoogleTranslator
+        translator = GoogleTranslator()
+    elif name == 'marian':
+        from ai_translator import LocalAITranslator
+        translator = LocalAITranslator()
+    elif name in ('openai', 'google_api'):
+        from ai_translator import AITranslator
+        key = os.environ.get('OPENAI_API_KEY' if name == 'openai' else 'GOOGLE_API_KEY')
+        if not key:
+            raise RuntimeError(f"{'OPENAI_API_KEY' if name == 'openai' else 'GOOGLE_API_KEY'} is not set")
+        translator = AITranslator('openai' if name == 'openai' else 'google', api_key=key)
+        return translator.translate
+    else:
+        raise ValueError(f"Unknown translator: {name} (choose from {TRANSLATORS})")
+    if not translator.available:
+        raise RuntimeError(f"{name} translator is not available")
+    return translator.translate
+
+
+def spearman(a: List[float], b: List[float]) -> float:
+    """順位相関（同順位は平均順位）"""
+    def ranks(values):
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(values, kind='mergesort')
+        ranked = np.empty(len(values), dtype=np.float64)
+        ranked[order] = np.arange(len(values), dtype=np.float64)
+        # 同じ値には平均順位を割り当てる
+        for value in np.unique(values):
+            tied = values == value
+            ranked[tied] = ranked[tied].mean()
+        return ranked
+
+    if len(a) < 2:
+        return 1.0
+    rank_a, rank_b = ranks(a), ranks(b)
+    if rank_a.std() == 0 or rank_b.std() == 0:
+        return 1.0 if np.array_equal(rank_a, rank_b) else 0.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def _latency_summary(latencies: List[float]) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': float(np.mean(ordered)) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+    }
+
+
+def _translate_corpus(translate: Callable[[str], str], corpus: List[Dict]) -> Dict:
+    """コーパス全体を翻訳し、翻訳結果と1件ごとのレイテンシを返す"""
+    translations, latencies = [], []
+    for item in corpus:
+        start = time.perf_counter()
+        translations.append(translate(item['answer']))
+        latencies.append(time.perf_counter() - start)
+    return {'translations': translations, 'latencies': latencies}
+
+
+def _score_corpus(system: JapaneseToEnglishSystem, translations: List[str], corpus: List[Dict]) -> Dict:
+    """翻訳済みの英文を正解英文と比較して採点"""
+    scores, grades, latencies = [], [], []
+    for translated, item in zip(translations, corpus):
+        start = time.perf_counter()
+        similarity = system.calculate_english_similarity(translated, item['question']['english_reference'])
+        latencies.append(time.perf_counter() - start)
+        score = int(similarity['final_score'] * 100)
+        scores.append(score)
+        grades.append(system._grade_for_score(score)[0])
+    return {'scores': scores, 'grades': grades, 'latencies': latencies}
+
+
+def compare(a: Dict, baseline: Dict) -> Dict:
+    """基準の組み合わせに対するスコア差・グレード一致率・順位相関"""
+    deltas = np.asarray(a['scores'], dtype=np.float64) - np.asarray(baseline['scores'], dtype=np.float64)
+    agree = sum(1 for x, y in zip(a['grades'], baseline['grades']) if x == y)
+    return {
+        'mean_delta': float(deltas.mean()),
+        'mean_abs_delta': float(np.abs(deltas).mean()),
+        'max_abs_delta': float(np.abs(deltas).max()),
+        'grade_agreement': agree / len(deltas),
+        'spearman': spearman(a['scores'], baseline['scores']),
+    }
+
+
+def run_comparison(translators: List[str], similarity_backends: List[str], baseline: Optional[str] = None,
+                   corpus_size: int = 100, seed: int = 0) -> Dict:
+    """全組み合わせで同じコーパスを採点し、基準との比較を含むレポートを返す"""
+    questions = JapaneseToEnglishSystem._load_sample_questions()
+    corpus = generate_answer_corpus(questions, corpus_size, seed)
+
+    # 翻訳は類似度バックエンドに依存しないため翻訳器ごとに1回だけ実行
+    translated: Dict[str, Dict] = {}
+    loads: Dict[str, Dict] = {}
+    skipped: Dict[str, str] = {}
+    for name in translators:
+        before = rss_mb()
+        started = time.perf_counter()
+        try:
+            translate = load_translator(name)
+        except Exception as e:
+            skipped[f"translator:{name}"] = str(e)
+            continue
+        loads[f"translator:{name}"] = {'load_s': time.perf_counter() - started, 'rss_delta_mb': rss_mb() - before}
+        translated[name] = _translate_corpus(translate, corpus)
+        del translate
+        gc.collect()
+
+    systems: Dict[str, JapaneseToEnglishSystem] = {}
+    for backend in similarity_backends:
+        before = rss_mb()
+        started = time.perf_counter()
+        system = JapaneseToEnglishSystem(embeddings_backend=backend)
+        if backend != 'none' and not system.use_embeddings:
+            skipped[f"similarity:{backend}"] = "embedding model could not be loaded"
+            continue
+        loads[f"similarity:{backend}"] = {'load_s': time.perf_counter() - started, 'rss_delta_mb': rss_mb() - before}
+        systems[backend] = system
+
+    combinations: Dict[str, Dict] = {}
+    results: Dict[str, Dict] = {}
+    for name, translation in translated.items():
+        for backend, system in systems.items():
+            key = f"{name}:{backend}"
+            scored = _score_corpus(system, translation['translations'], corpus)
+            totals = [t + s for t, s in zip(translation['latencies'], scored['latencies'])]
+            results[key] = scored
+            combinations[key] = {
+                'translate': _latency_summary(translation['latencies']),
+                'similarity': _latency_summary(scored['latencies']),
+                'total': _latency_summary(totals),
+                'memory_mb': {
+                    'translator_load': loads[f"translator:{name}"]['rss_delta_mb'],
+                    'similarity_load': loads[f"similarity:{backend}"]['rss_delta_mb'],
+                },
+                'mean_score': float(np.mean(scored['scores'])),
+                'grade_distribution': {g: scored['grades'].count(g) for g in 'SABCDF'},
+            }
+
+    if not combinations:
+        raise RuntimeError("no translator × similarity combination could be loaded")
+    baseline = baseline or next(iter(combinations))
+    if baseline not in combinations:
+        raise ValueError(f"baseline {baseline} is not available (available: {', '.join(combinations)})")
+    for key, summary in combinations.items():
+        summary['vs_baseline'] = compare(results[key], results[baseline])
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'corpus_size': corpus_size,
+            'seed': seed,
+            'baseline': baseline,
+            'peak_rss_mb': rss_mb(),
+        },
+        'loads': loads,
+        'combinations': combinations,
+        'skipped': skipped,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare translator × similarity backends on a fixed answer corpus")
+    parser.add_argument('--translators', default='mock,google,marian',
+                        help=f"比較する翻訳器（カンマ区切り、{', '.join(TRANSLATORS)}）")
+    parser.add_argument('--similarity', default='none,static,distilbert',
+                        help=f"比較する類似度バックエンド（カンマ区切り、{', '.join(SIMILARITY_BACKENDS)}）")
+    parser.add_argument('--baseline', default=None,
+                        help="基準の組み合わせ（translator:similarity、省略時は最初に読み込めた組み合わせ）")
+    parser.add_argument('--corpus-size', type=int, default=100, help="合成回答コーパスの件数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="JSON の出力先（省略時は標準出力）")
+    args = parser.parse_args(argv)
+
+    translators = [t.strip() for t in args.translators.split(',') if t.strip()]
+    backends = [b.strip() for b in args.similarity.split(',') if b.strip()]
+    for translator in translators:
+        if translator not in TRANSLATORS:
+            parser.error(f"unknown translator: {translator}")
+    for backend in backends:
+        if backend not in SIMILARITY_BACKENDS:
+            parser.error(f"unknown similarity backend: {backend}")
+
+    # 読み込み時のログが JSON 出力に混ざらないよう stderr に逃がす
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_comparison(translators, backends, args.baseline, args.corpus_size, args.seed)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"[COMPARE] Results written to {args.output}")
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
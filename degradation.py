@@ -0,0 +1,122 @@
+"""
+Adaptive Degradation Controller
+直近の採点レイテンシ p95 と処理中のリクエスト数を監視し、SLO を超えたら採点を段階的に軽くする
+
+段階（tier）:
+    full                 設定どおりの翻訳器 + ベクトル類似度
+    fallback_translator  辞書ベースの翻訳 + ベクトル類似度
+    lexical              辞書ベースの翻訳 + 字句指標のみ
+
+p95 が目標（QUIZ_SLO_P95_MS）を超えるか処理中が QUIZ_SLO_QUEUE_LIMIT を超えると1段下げ、
+p95 が目標の recover_ratio 倍を下回った状態が続いたら1段戻します（ヒステリシス）。
+段階を変えるたびに観測窓をリセットし、最低 QUIZ_SLO_DWELL_S 秒は同じ段階に留まります。
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import tracing
+from metrics import REGISTRY
+from stage_timings import percentile
+
+TIERS = ('full', 'fallback_translator', 'lexical')
+
+DEGRADATION_TIER = REGISTRY.gauge(
+    'quiz_degradation_tier', 'Current scoring tier (0=full, 1=fallback_translator, 2=lexical)')
+TIER_TRANSITIONS = REGISTRY.counter(
+    'quiz_degradation_transitions_total', 'Tier changes by direction', ['direction'])
+IN_FLIGHT = REGISTRY.gauge(
+    'quiz_score_in_flight', 'score_translation calls currently being processed')
+
+
+class DegradationController:
+    """レイテンシ SLO に応じて採点の段階を上げ下げする（プロセス内で共有）"""
+
+    def __init__(self, target_p95_ms: float, queue_limit: int = 16, window: int = 50,
+                 min_samples: int = 10, recover_ratio: float = 0.6, dwell_seconds: float = 10.0):
+        self.target_p95_ms = target_p95_ms
+        self.queue_limit = queue_limit
+        self.min_samples = min_samples
+        self.recover_ratio = recover_ratio
+        self.dwell_seconds = dwell_seconds
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._level = 0
+        self._changed_at = time.monotonic()
+        self._in_flight = 0
+        DEGRADATION_TIER.set(0)
+
+    @property
+    def tier(self) -> str:
+        return TIERS[self._level]
+
+    def enter(self) -> str:
+        """採点開始時に呼び、この採点で使う段階を返す"""
+        with self._lock:
+            self._in_flight += 1
+            IN_FLIGHT.set(self._in_flight)
+            # 処理中が上限を超えたらレイテンシの悪化を待たずに下げる
+            if self._in_flight > self.queue_limit:
+                self._step(+1, f"in-flight {self._in_flight} > {self.queue_limit}")
+            return TIERS[self._level]
+
+    def exit(self, latency_seconds: float, tier: str):
+        """採点終了時に呼び、レイテンシを記録して段階を見直す"""
+        with self._lock:
+            self._in_flight -= 1
+            IN_FLIGHT.set(self._in_flight)
+            # 別の段階で処理された結果は今の段階の判断に混ぜない
+            if tier != TIERS[self._level]:
+                return
+            self._latencies.append(latency_seconds * 1000)
+            if len(self._latencies) < self.min_samples:
+                return
+
+            p95 = percentile(sorted(self._latencies), 95)
+            if p95 > self.target_p95_ms:
+                self._step(+1, f"p95 {p95:.0f}ms > {self.target_p95_ms:.0f}ms")
+            elif p95 < self.target_p95_ms * self.recover_ratio and self._in_flight <= self.queue_limit // 2:
+                self._step(-1, f"p95 {p95:.0f}ms < {self.target_p95_ms * self.recover_ratio:.0f}ms")
+
+    def _step(self, direction: int, reason: str):
+        level = self._level + direction
+        if not 0 <= level < len(TIERS):
+            return
+        if time.monotonic() - self._changed_at < self.dwell_seconds:
+            return
+        tracing.warning("[DEGRADATION] %s -> %s (%s)", TIERS[self._level], TIERS[level], reason)
+        self._level = level
+        self._changed_at = time.monotonic()
+        self._latencies.clear()
+        DEGRADATION_TIER.set(level)
+        TIER_TRANSITIONS.labels('down' if direction > 0 else 'up').inc()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return {
+            'tier': self.tier,
+            'in_flight': self._in_flight,
+            'window_p95_ms': percentile(latencies, 95),
+            'target_p95_ms': self.target_p95_ms,
+        }
+
+
+def controller_from_env() -> Optional[DegradationController]:
+    """QUIZ_SLO_P95_MS が設定されていればコントローラーを作成（未設定なら常に full）"""
+    target = os.environ.get('QUIZ_SLO_P95_MS')
+    if not target:
+        return None
+    controller = DegradationController(
+        float(target),
+        queue_limit=int(os.environ.get('QUIZ_SLO_QUEUE_LIMIT', '16')),
+        dwell_seconds=float(os.environ.get('QUIZ_SLO_DWELL_S', '10')),
+    )
+    print(f"[DEGRADATION] Adaptive degradation enabled (p95 target {target}ms)")
+    return controller
+
+
+# プロセス全体で共有するコントローラー（全セッションの負荷を見る）
+DEGRADATION = controller_from_env()
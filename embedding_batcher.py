@@ -0,0 +1,130 @@
+"""
+Cross-session Micro-batching for Embeddings
+全セッションの encode 要求を数ミリ秒集めて1回のバッチ forward pass にまとめる推論キュー
+
+EnglishEmbeddings（または同じインターフェースのバックエンド）をラップし、
+同じ encode / encode_single / calculate_similarity を提供します。
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+import numpy as np
+
+from metrics import REGISTRY
+from vector_similarity import EncoderSimilarity
+
+BATCH_SIZE = REGISTRY.histogram(
+    'quiz_embedding_batch_size', 'Texts per batched forward pass',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+BATCH_WAIT = REGISTRY.histogram(
+    'quiz_embedding_batch_wait_seconds', 'Time a request waited in the batching queue')
+QUEUE_DEPTH = REGISTRY.gauge(
+    'quiz_embedding_queue_depth', 'Encode requests waiting in the batching queue')
+
+
+class _Request:
+    __slots__ = ('texts', 'future', 'enqueued')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingBatcher(EncoderSimilarity):
+    """encode 要求を max_wait_ms または max_batch まで集めて一括処理"""
+
+    def __init__(self, embeddings, max_wait_ms: float = 5.0, max_batch: int = 32):
+        self.embeddings = embeddings
+        self.dimension = embeddings.dimension
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._batch_sizes = {}
+        self._batches = 0
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+        print(f"[BATCHING] Embedding micro-batching enabled (max_wait={max_wait_ms}ms, max_batch={max_batch})")
+
+    def submit(self, texts: List[str]) -> Future:
+        """encode を非同期に要求（結果は np.ndarray）"""
+        request = _Request(list(texts))
+        self._queue.put(request)
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return request.future
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """複数の英文をベクトル化（他セッションの要求とまとめて実行）"""
+        return self.submit(texts).result()
+
+    def _collect(self) -> List[_Request]:
+        """最初の要求を待ち、その後 max_wait まで（または max_batch に達するまで）集める"""
+        batch = [self._queue.get()]
+        count = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+
+        while count < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            count += len(request.texts)
+
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request.texts]
+            started = time.perf_counter()
+            for request in batch:
+                BATCH_WAIT.observe(started - request.enqueued)
+            BATCH_SIZE.observe(len(texts))
+            self._batches += 1
+            self._batch_sizes[len(texts)] = self._batch_sizes.get(len(texts), 0) + 1
+
+            try:
+                vectors = self.embeddings.encode(texts)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                n = len(request.texts)
+                request.future.set_result(vectors[offset:offset + n])
+                offset += n
+
+    def stats(self) -> dict:
+        """キュー長とバッチサイズ分布"""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': self._batches,
+            'batch_size_distribution': dict(sorted(self._batch_sizes.items())),
+            'max_wait_ms': self.max_wait * 1000,
+            'max_batch': self.max_batch,
+        }
+
+
+def batching_enabled_by_default() -> bool:
+    """環境変数 QUIZ_EMBEDDING_BATCHING でマイクロバッチを有効化"""
+    return os.environ.get('QUIZ_EMBEDDING_BATCHING', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def batcher_from_env(embeddings) -> EmbeddingBatcher:
+    """QUIZ_BATCH_MAX_WAIT_MS / QUIZ_BATCH_MAX_SIZE を使って EmbeddingBatcher を作成"""
+    return EmbeddingBatcher(
+        embeddings,
+        max_wait_ms=float(os.environ.get('QUIZ_BATCH_MAX_WAIT_MS', '5')),
+        max_batch=int(os.environ.get('QUIZ_BATCH_MAX_SIZE', '32')),
+    )
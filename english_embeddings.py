@@ -7,7 +7,16 @@ from typing import List
 import torch
 from transformers import AutoTokenizer, AutoModel
 
-class EnglishEmbeddings:
+from metrics import REGISTRY
+from tokenization_cache import TOKENIZATION_CACHE
+from vector_similarity import EncoderSimilarity
+
+ENCODE_LATENCY = REGISTRY.histogram(
+    'quiz_embedding_encode_seconds', 'EnglishEmbeddings.encode latency per call')
+ENCODE_TEXTS = REGISTRY.counter(
+    'quiz_embedding_texts_total', 'Texts encoded by EnglishEmbeddings')
+
+class EnglishEmbeddings(EncoderSimilarity):
     """英文専用のDistilBERT埋め込みモデル"""
 
     def __init__(self):
@@ -16,6 +25,7 @@ class EnglishEmbeddings:
 
         # 英語専用のDistilBERT
         model_name = 'distilbert-base-uncased'
+        self.model_name = model_name
 
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
@@ -28,46 +38,46 @@ class EnglishEmbeddings:
 
     def encode(self, texts: List[str]) -> np.ndarray:
         """複数の英文をベクトル化"""
-        embeddings = []
+        ENCODE_TEXTS.inc(len(texts))
+        with ENCODE_LATENCY.time():
+            return self._encode(texts)
+
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        """英文をトークンIDに変換（事前計算済みの正解英文・最近の英文はキャッシュから）"""
+        return TOKENIZATION_CACHE.tokenize(self.model_name, self._tokenize_uncached, texts)
+
+    def _tokenize_uncached(self, texts: List[str]) -> List[List[int]]:
+        return self.tokenizer(texts, truncation=True, max_length=512)['input_ids']
+
+    def encode_tokenized(self, token_ids: List[List[int]]) -> np.ndarray:
+        """トークナイズ済みの入力をベクトル化（モデル計算のみ）"""
+        ENCODE_TEXTS.inc(len(token_ids))
+        with ENCODE_LATENCY.time():
+            return self._forward(token_ids)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self._forward(self.tokenize(texts))
+
+    def _forward(self, token_ids: List[List[int]]) -> np.ndarray:
+        if not token_ids:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # 右側をパディングしてまとめ、1回の forward pass で処理
+        length = max(len(ids) for ids in token_ids)
+        input_ids = torch.full((len(token_ids), length), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(token_ids), length), dtype=torch.long)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, :len(ids)] = 1
 
         with torch.no_grad():
-            for text in texts:
-                inputs = self.tokenizer(
-                    text,
-                    return_tensors='pt',
-                    truncation=True,
-                    max_length=512,
-                    padding=True
-                )
-
-                outputs = self.model(**inputs)
-                # 平均プーリングを使用（より良い表現）
-                token_embeddings = outputs.last_hidden_state
-                input_mask_expanded = inputs['attention_mask'].unsqueeze(-1).expand(token_embeddings.size()).float()
-                # マスクされたトークンを除外して平均を計算
-                sum_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1)
-                sum_mask = torch.clamp(input_mask_expanded.sum(1), min=1e-9)
-                embedding = (sum_embeddings / sum_mask).squeeze().numpy()
-                embeddings.append(embedding)
-
-        return np.array(embeddings)
-
-    def encode_single(self, text: str) -> List[float]:
-        """単一の英文をベクトル化"""
-        return self.encode([text])[0].tolist()
-
-    def calculate_similarity(self, text1: str, text2: str) -> float:
-        """2つの英文間のコサイン類似度を計算"""
-        vec1 = self.encode([text1])[0]
-        vec2 = self.encode([text2])[0]
-
-        # コサイン類似度
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-
-        similarity = dot_product / (norm1 * norm2)
-        return float(similarity)
\ No newline at end of file
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            # 平均プーリングを使用（より良い表現）
+            token_embeddings = outputs.last_hidden_state
+            input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+            # マスクされたトークン（パディング含む）を除外して平均を計算
+            sum_embeddings = torch.sum(token_embeddings * input_mask_expanded, 1)
+            sum_mask = torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+            embeddings = (sum_embeddings / sum_mask).numpy()
+
+        return embeddings
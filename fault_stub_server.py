@@ -0,0 +1,186 @@
+"""
+Fault-injecting Translation Stub Server
+Google Translate v2 / OpenAI chat completions 互換のローカルスタブ（エラー・遅延・無応答を注入）
+
+スタブの起動:
+    python fault_stub_server.py serve --port 8765 --error-rate 0.2 --slow-rate 0.1 --slow-ms 3000
+    QUIZ_GOOGLE_API_BASE=http://127.0.0.1:8765 QUIZ_OPENAI_API_BASE=http://127.0.0.1:8765/v1 ...
+
+障害注入下での耐障害レイヤーの確認（スタブを内部で起動し、レイテンシと結果の内訳を JSON で出力）:
+    python fault_stub_server.py drill --requests 200 --error-rate 0.3 --hang-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from stage_timings import percentile
+
+
+class Faults:
+    """注入する障害の設定（リクエストごとに乱数で決定）"""
+
+    def __init__(self, error_rate: float = 0.0, slow_rate: float = 0.0, slow_ms: float = 2000,
+                 hang_rate: float = 0.0, hang_ms: float = 60000, latency_ms: float = 20, seed: Optional[int] = None):
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.hang_rate = hang_rate
+        self.hang_ms = hang_ms
+        self.latency_ms = latency_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """(遅延秒, エラーにするか)"""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.hang_rate:
+            return self.hang_ms / 1000, False
+        roll -= self.hang_rate
+        if roll < self.error_rate:
+            return self.latency_ms / 1000, True
+        roll -= self.error_rate
+        if roll < self.slow_rate:
+            return self.slow_ms / 1000, False
+        return self.latency_ms / 1000, False
+
+
+def _stub_translation(text: str) -> str:
+    from japanese_to_english_system import JapaneseToEnglishSystem
+    return JapaneseToEnglishSystem.translate_japanese_to_english_mock(text)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # クライアントがタイムアウトで切断済み
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        delay, fail = self.server.faults.draw()
+        time.sleep(delay)
+        if fail:
+            self._send_json(503, {'error': 'injected fault'})
+            return
+
+        path = self.path.split('?')[0]
+        if path.endswith('/language/translate/v2'):
+            text = parse_qs(body).get('q', [''])[0]
+            self._send_json(200, {'data': {'translations': [{'translatedText': _stub_translation(text)}]}})
+        elif path.endswith('/chat/completions'):
+            prompt = json.loads(body)['messages'][-1]['content']
+            text = prompt.split(': ', 1)[-1]
+            self._send_json(200, {'choices': [{'message': {'content': _stub_translation(text)}}]})
+        else:
+            self._send_json(404, {'error': f'unknown path {path}'})
+
+
+def start_stub(faults: Faults, port: int = 0, addr: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """スタブをバックグラウンドスレッドで起動（port=0 で空きポート）"""
+    server = ThreadingHTTPServer((addr, port), _StubHandler)
+    server.daemon_threads = True
+    server.faults = faults
+    threading.Thread(target=server.serve_forever, name='fault-stub', daemon=True).start()
+    return server
+
+
+def run_drill(faults: Faults, requests_total: int = 200, concurrency: int = 8, backend: str = 'google',
+              interval_ms: float = 10) -> dict:
+    """障害を注入したスタブに AITranslator から翻訳を要求し、レイテンシと結果の内訳を集計"""
+    server = start_stub(faults)
+    host, port = server.server_address
+    os.environ['QUIZ_GOOGLE_API_BASE'] = f"http://{host}:{port}"
+    os.environ['QUIZ_OPENAI_API_BASE'] = f"http://{host}:{port}/v1"
+
+    from ai_translator import AITranslator
+    from resilience import REMOTE_OUTCOMES, breaker_for, default_deadline
+
+    translator = AITranslator(backend, api_key='stub')
+    texts = ["人工知能は私たちの生活を変えています。", "会議は午後3時から始まります", "このコードにはバグがあります"]
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        translator.translate(texts[i % len(texts)])
+        elapsed = (time.perf_counter() - start) * 1000
+        # 利用者の間隔を模擬（フォールバックが即答でも要求が一瞬で尽きないように）
+        time.sleep(interval_ms / 1000)
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(requests_total)))
+    server.shutdown()
+
+    breaker_name = 'google_api' if backend == 'google' else backend
+    outcomes = {
+        outcome: REMOTE_OUTCOMES.labels(breaker_name, outcome).value()
+        for outcome in ('success', 'hedged_success', 'short_circuit', 'deadline', 'error')
+    }
+    return {
+        'requests': requests_total,
+        'deadline_s': default_deadline(),
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1],
+        },
+        'outcomes': outcomes,
+        'breaker': breaker_for(breaker_name).stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fault-injecting translation stub server")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('serve', "スタブを起動"), ('drill', "スタブに対して翻訳を実行し結果を集計")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument('--error-rate', type=float, default=0.0, help="503 を返す割合")
+        command.add_argument('--slow-rate', type=float, default=0.0, help="--slow-ms だけ遅らせる割合")
+        command.add_argument('--slow-ms', type=float, default=2000)
+        command.add_argument('--hang-rate', type=float, default=0.0, help="応答しない（--hang-ms 待つ）割合")
+        command.add_argument('--hang-ms', type=float, default=60000)
+        command.add_argument('--latency-ms', type=float, default=20, help="通常時の応答時間")
+        command.add_argument('--seed', type=int, default=None)
+    sub.choices['serve'].add_argument('--port', type=int, default=8765)
+    sub.choices['drill'].add_argument('--requests', type=int, default=200)
+    sub.choices['drill'].add_argument('--concurrency', type=int, default=8)
+    sub.choices['drill'].add_argument('--backend', default='google', choices=['google', 'openai'])
+    sub.choices['drill'].add_argument('--interval-ms', type=float, default=10, help="各ワーカーの要求間隔")
+    args = parser.parse_args(argv)
+
+    faults = Faults(args.error_rate, args.slow_rate, args.slow_ms, args.hang_rate, args.hang_ms,
+                    args.latency_ms, args.seed)
+    if args.command == 'serve':
+        server = start_stub(faults, args.port)
+        print(f"[STUB] Listening on http://127.0.0.1:{args.port} "
+              f"(error={args.error_rate}, slow={args.slow_rate}, hang={args.hang_rate})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        print(json.dumps(run_drill(faults, args.requests, args.concurrency, args.backend, args.interval_ms), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,20 @@
 """
 Google Translate API (無料版) を使用した高品質翻訳
 """
-import time
+import os
 from typing import Optional
 
+import tracing
+from metrics import TRANSLATE_FALLBACKS, TRANSLATE_LATENCY, TRANSLATE_REQUESTS, timed
+from resilience import call_protected
+
 class GoogleTranslator:
     """Google翻訳による高品質な日英翻訳"""
 
     def __init__(self):
         self.available = False
         self.translator = None
+        self.is_deployment = self._detect_deployment()
 
         try:
             from googletrans import Translator
@@ -18,6 +23,10 @@ class GoogleTranslator:
             print("[GOOGLE TRANSLATE] High-quality translation engine initialized")
             print("[INFO] Free Google Translate API ready for use")
         except ImportError:
+            # コールドスタートを予測可能にするため QUIZ_RUNTIME_INSTALL=0 で実行時の pip install を行わない
+            if os.environ.get('QUIZ_RUNTIME_INSTALL', '1').lower() in ('0', 'false', 'no', 'off'):
+                print("[WARNING] googletrans not installed (runtime install disabled)")
+                return
             print("[WARNING] googletrans not installed. Installing...")
             try:
                 import subprocess
@@ -33,69 +42,66 @@ class GoogleTranslator:
             print(f"[ERROR] Failed to initialize Google Translate: {e}")
             self.available = False
 
-    def translate(self, japanese_text: str, retries: int = 2) -> str:
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        return ('googletrans', self.available)
+
+    @timed(TRANSLATE_LATENCY.labels('google'), TRANSLATE_REQUESTS.labels('google'))
+    def translate(self, japanese_text: str) -> str:
         """高品質なGoogle翻訳を実行（フォールバック付き）"""
-        print(f"[TRANSLATE] Input: '{japanese_text}'")
+        with tracing.span('translate.google'):
+            return self._translate(japanese_text)
+
+    def _translate(self, japanese_text: str) -> str:
+        tracing.debug("[TRANSLATE] Input: '%s'", japanese_text)
 
         # デプロイメント環境では常にフォールバック辞書を優先使用
         # Streamlit Cloudでのgoogletransライブラリの不安定性を回避
-        import os
-        import platform
-
-        # 複数の方法でデプロイメント環境を検出
-        is_deployment = (
-            os.environ.get('STREAMLIT_SHARING_MODE') or
-            os.environ.get('STREAMLIT_CLOUD_MODE') or
-            os.environ.get('STREAMLIT_SERVER_PORT') or
-            'streamlit' in os.environ.get('PATH', '').lower() or
-            platform.system() == 'Linux'  # Streamlit CloudはLinux環境
-        )
-
         # 強制的にフォールバックモードを使用（Streamlit Cloud対応）
-        print(f"[DEBUG] Environment check: deployment={is_deployment}, platform={platform.system()}")
-        if is_deployment or True:  # 一時的に常にフォールバックを使用
-            print("[DEPLOYMENT] Using fallback-only mode for cloud deployment reliability")
+        if self.is_deployment or True:  # 一時的に常にフォールバックを使用
+            tracing.debug("[DEPLOYMENT] Using fallback-only mode for cloud deployment reliability",
+                          deployment=bool(self.is_deployment))
             return self._fallback_translation(japanese_text)
 
         # まずフォールバック辞書をチェック（高速かつ確実）
         fallback_result = self._check_fallback_first(japanese_text)
         if fallback_result:
-            print(f"[FALLBACK-DIRECT] Found match: '{japanese_text}' -> '{fallback_result}'")
+            tracing.debug("[FALLBACK-DIRECT] Found match: '%s' -> '%s'", japanese_text, fallback_result)
             return fallback_result
 
         if not self.available or not self.translator:
-            print(f"[FALLBACK] Google Translate not available: available={self.available}, translator={self.translator}")
+            tracing.debug("[FALLBACK] Google Translate not available", available=self.available)
             return self._fallback_translation(japanese_text)
 
         # Google翻訳を試行（ローカル環境のみ）
-        for attempt in range(retries):
-            try:
-                # Google翻訳を実行
-                result = self.translator.translate(
-                    japanese_text,
-                    src='ja',
-                    dest='en'
-                )
-
-                if result and result.text and len(result.text.strip()) > 2:
-                    translated_text = result.text.strip()
-
-                    # Check for invalid translations (single word responses or obvious failures)
-                    if self._is_invalid_translation(japanese_text, translated_text):
-                        print(f"[INVALID] Google Translate returned invalid result: '{translated_text}' for '{japanese_text}'")
-                        continue
+        # ブレーカー・期限・ヘッジで保護し、失敗時は待たずにフォールバック
+        return call_protected(
+            'google', self._request, japanese_text,
+            fallback=lambda: self._fallback_translation(japanese_text),
+            is_valid=lambda text: len(text) > 2 and not self._is_invalid_translation(japanese_text, text),
+        )
 
-                    print(f"[SUCCESS] Google Translate: '{japanese_text}' -> '{translated_text}'")
-                    return translated_text
+    def _request(self, japanese_text: str) -> str:
+        """Google翻訳を1回呼び出す"""
+        result = self.translator.translate(japanese_text, src='ja', dest='en')
+        translated_text = result.text.strip() if result and result.text else ''
+        tracing.debug("[GOOGLE] '%s' -> '%s'", japanese_text, translated_text)
+        return translated_text
 
-            except Exception as e:
-                print(f"[ERROR] Google Translate attempt {attempt + 1}/{retries}: {e}")
-                if attempt < retries - 1:
-                    time.sleep(0.5)
-                    continue
+    @staticmethod
+    def _detect_deployment() -> bool:
+        """複数の方法でデプロイメント環境を検出（リクエストごとではなく初期化時に一度だけ）"""
+        import os
+        import platform
 
-        print("[FALLBACK] Google Translate failed, using fallback")
-        return self._fallback_translation(japanese_text)
+        return bool(
+            os.environ.get('STREAMLIT_SHARING_MODE') or
+            os.environ.get('STREAMLIT_CLOUD_MODE') or
+            os.environ.get('STREAMLIT_SERVER_PORT') or
+            'streamlit' in os.environ.get('PATH', '').lower() or
+            platform.system() == 'Linux'  # Streamlit CloudはLinux環境
+        )
 
     def _is_invalid_translation(self, japanese_text: str, translated_text: str) -> bool:
         """翻訳結果が無効かどうかをチェック"""
@@ -129,7 +135,8 @@ class GoogleTranslator:
 
     def _fallback_translation(self, text: str) -> str:
         """フォールバック: 改善された辞書ベース翻訳"""
-        print(f"[FALLBACK] Using fallback translation for: '{text}'")
+        TRANSLATE_FALLBACKS.labels('google').inc()
+        tracing.debug("[FALLBACK] Using fallback translation for: '%s'", text)
 
         # 包括的な翻訳パターン
         patterns = {
@@ -241,27 +248,31 @@ class SmartHybridTranslator:
         else:
             print("[HYBRID] Using fallback translation patterns")
 
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        return ('hybrid', self.use_google)
+
+    @timed(TRANSLATE_LATENCY.labels('hybrid'), TRANSLATE_REQUESTS.labels('hybrid'))
     def translate(self, japanese_text: str) -> str:
         """最適な方法で翻訳を実行"""
         if not japanese_text or not japanese_text.strip():
             return ""
 
-        print(f"[HYBRID] Translating: '{japanese_text}'")
-        print(f"[HYBRID] Google available: {self.use_google}")
+        with tracing.span('translate.hybrid', google=self.use_google):
+            tracing.debug("[HYBRID] Translating: '%s'", japanese_text)
 
-        # Google翻訳を優先的に使用
-        if self.use_google:
-            translation = self.google_translator.translate(japanese_text)
-            print(f"[HYBRID] Result from Google: '{translation}'")
+            # Google翻訳を優先的に使用
+            if self.use_google:
+                translation = self.google_translator.translate(japanese_text)
+                tracing.debug("[HYBRID] Result from Google: '%s'", translation)
 
-            # 翻訳が短すぎる場合は再試行
-            if len(translation.split()) < len(japanese_text) / 10:
-                print("[INFO] Translation seems incomplete, retrying...")
-                translation = self.google_translator.translate(japanese_text, retries=5)
-                print(f"[HYBRID] Retry result: '{translation}'")
+                # 短すぎる結果の再試行はしない（GoogleTranslator 側で検証・ヘッジ済み）
+                if len(translation.split()) < len(japanese_text) / 10:
+                    tracing.info("[HYBRID] Translation seems incomplete: '%s'", translation)
 
-            return translation
+                return translation
 
-        # フォールバック
-        print("[HYBRID] Using fallback translation")
-        return self.google_translator._fallback_translation(japanese_text)
+            # フォールバック
+            tracing.debug("[HYBRID] Using fallback translation")
+            return self.google_translator._fallback_translation(japanese_text)
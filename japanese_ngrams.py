@@ -0,0 +1,102 @@
+"""
+Japanese Character N-gram Similarity
+学習者の日本語を問題の日本語文と直接比べる（翻訳を通さない）文字 n-gram TF-IDF 類似度
+
+問題ごとの TF-IDF ベクトル（疎ベクトル、L2 正規化済み）は索引作成時に一度だけ計算し、
+採点時は回答側の n-gram を数えて共通する項だけの内積を取ります。
+言い換えとして登録された alternate_japanese があれば、その中で最も近い文の類似度を使います。
+
+QUIZ_JAPANESE_WEIGHT で総合スコアに加える重み（0 で無効）、
+QUIZ_JAPANESE_PREFILTER でこの類似度が閾値未満の回答を翻訳せずに採点する事前フィルタを設定します。
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from result_memo import normalize_japanese_answer
+
+# 句読点・記号・空白は n-gram に含めない
+_IGNORED = re.compile(r"[\s、。，．,.!?！？「」『』（）()・…ー〜~\"'：:；;]+")
+
+NGRAM_SIZES = (1, 2, 3)
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> Counter:
+    """正規化した日本語文の文字 n-gram の出現回数"""
+    text = _IGNORED.sub('', normalize_japanese_answer(text))
+    grams = Counter()
+    for n in sizes:
+        grams.update(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+def _weigh(grams: Counter, idf: Dict[str, float], default_idf: float) -> Dict[str, float]:
+    """サブリニア TF × IDF を L2 正規化した疎ベクトル（索引に無い n-gram もノルムには含める）"""
+    vector = {gram: (1.0 + math.log(count)) * idf.get(gram, default_idf) for gram, count in grams.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm == 0:
+        return {}
+    return {gram: weight / norm for gram, weight in vector.items()}
+
+
+def sparse_dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """疎ベクトルの内積（小さい方を走査）"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+class JapaneseNgramIndex:
+    """問題の日本語文（と言い換え）ごとの TF-IDF ベクトル"""
+
+    def __init__(self, questions: Iterable[Dict], sizes: Sequence[int] = NGRAM_SIZES):
+        self.sizes = tuple(sizes)
+        texts_by_id: Dict[int, List[str]] = {}
+        for question in questions:
+            texts_by_id[question['id']] = [question['japanese']] + list(question.get('alternate_japanese', []))
+
+        grams_by_id = {qid: [char_ngrams(text, self.sizes) for text in texts] for qid, texts in texts_by_id.items()}
+        documents = [grams for variants in grams_by_id.values() for grams in variants]
+        frequency = Counter()
+        for grams in documents:
+            frequency.update(grams.keys())
+
+        # 平滑化した IDF（索引に無い n-gram は出現0回として扱う）
+        total = len(documents)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1.0 for gram, df in frequency.items()}
+        self.default_idf = math.log(1 + total) + 1.0
+        self.vectors: Dict[int, List[Dict[str, float]]] = {
+            qid: [_weigh(grams, self.idf, self.default_idf) for grams in variants]
+            for qid, variants in grams_by_id.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def vectorize(self, text: str) -> Dict[str, float]:
+        """回答の日本語文を同じ IDF で疎ベクトル化"""
+        return _weigh(char_ngrams(text, self.sizes), self.idf, self.default_idf)
+
+    def similarity(self, text: str, question_id: int) -> float:
+        """回答と問題の日本語文（言い換えを含む）の最大コサイン類似度（未登録の問題は 0.0）"""
+        query = self.vectorize(text)
+        variants = self.vectors.get(question_id)
+        if not query or not variants:
+            return 0.0
+        return max(sparse_dot(query, vector) for vector in variants)
+
+
+def japanese_weight_from_env() -> float:
+    """環境変数 QUIZ_JAPANESE_WEIGHT（総合スコアに加える重み、デフォルト 0 で無効）"""
+    weight = float(os.environ.get('QUIZ_JAPANESE_WEIGHT', '0'))
+    if not 0.0 <= weight < 1.0:
+        raise ValueError(f"QUIZ_JAPANESE_WEIGHT must be in [0, 1): {weight}")
+    return weight
+
+
+def prefilter_threshold_from_env() -> Optional[float]:
+    """環境変数 QUIZ_JAPANESE_PREFILTER（未設定なら事前フィルタなし）"""
+    value = os.environ.get('QUIZ_JAPANESE_PREFILTER')
+    return float(value) if value else None
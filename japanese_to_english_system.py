@@ -2,22 +2,61 @@
 Japanese to English Translation Quiz System
 日本語和訳を英訳に変換して、英文同士で評価するシステム
 """
+import contextvars
+import importlib.util
+import os
 import random
 import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 from difflib import SequenceMatcher
 from collections import Counter
 import requests
 import json
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-try:
-    from english_embeddings import EnglishEmbeddings
-    EMBEDDINGS_AVAILABLE = True
-except ImportError:
-    EMBEDDINGS_AVAILABLE = False
+import tracing
+from metrics import REGISTRY, start_exporters_from_env
+from result_memo import RESULT_MEMO, normalize_japanese_answer
+from stage_timings import STAGE_TIMINGS, new_timer, timings_enabled_by_default
+
+# torch / transformers は実際にモデルを読み込むまでインポートしない
+# （モデルサーバーを使うUIワーカーは軽量なまま起動できる）
+EMBEDDINGS_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('torch', 'transformers'))
+if not EMBEDDINGS_AVAILABLE:
     print("[WARNING] Vector embedding model not available (running in lightweight mode)")
 
+from degradation import DEGRADATION
+from embedding_batcher import batcher_from_env, batching_enabled_by_default
+from japanese_ngrams import JapaneseNgramIndex, japanese_weight_from_env, prefilter_threshold_from_env
+from model_lifecycle import ModelUnloaded, managed_embeddings_from_env
+from model_server import ModelServerClient, RemoteEmbeddings, RemoteTranslator
+from question_bank import load_question_bank
+from reference_index import ReferenceIndex, index_from_env
+from shared_reference_store import SharedReferenceStore, text_hash
+from single_flight import CoalescingEmbeddings, coalesced_translate, single_flight_enabled_by_default
+from static_embeddings import StaticWordEmbeddings
+from tokenization_cache import pin_reference_tokens
+from vector_similarity import cosine_matrix
+
+# 埋め込みバックエンド: distilbert（デフォルト）/ static（静的単語ベクトル）/
+# remote（モデルサーバー）/ none（軽量モード）
+EMBEDDINGS_BACKENDS = ('distilbert', 'static', 'remote', 'none')
+
+# 読み込んだ埋め込みモデルはプロセス内の全セッションで共有する
+_shared_embeddings: Dict[str, object] = {}
+_shared_embeddings_lock = threading.Lock()
+
+# フリー練習用の近傍検索インデックスもプロセスで1つ
+# （(埋め込みバックエンド, 共有参照名, 問題バンクのハッシュ) → (共有参照の世代, インデックス)）
+_reference_indexes: Dict[Tuple, Tuple[int, ReferenceIndex]] = {}
+_reference_indexes_lock = threading.Lock()
+
+# 問題IDごとの正解英文プロファイル（元の英文, クリーニング済み英文, 単語集合, 単語数）、全セッションで共有
+_reference_profiles: Dict[int, Tuple[str, str, frozenset, int]] = {}
+
 try:
     from google_translator import GoogleTranslator
     GOOGLE_TRANSLATOR_AVAILABLE = True
@@ -28,28 +67,126 @@ except ImportError:
 # ai_translator は使用しない（Google翻訳のみ）
 AI_TRANSLATOR_AVAILABLE = False
 
+# 総合スコアの重み
+AI_WEIGHTS = {
+    'vector': 0.4,    # ベクトル類似度 (40%)
+    'word': 0.3,      # 単語類似度 (30%)
+    'string': 0.2,    # 文字列類似度 (20%)
+    'structure': 0.1  # 構造類似度 (10%)
+}
+LIGHTWEIGHT_WEIGHTS = {
+    'word': 0.5,      # 単語類似度 (50%)
+    'string': 0.3,    # 文字列類似度 (30%)
+    'structure': 0.2  # 構造類似度 (20%)
+}
+
+# 採点ロジックを変更したら上げる（結果メモのキーに含まれる）
+SCORING_CONFIG_VERSION = 1
+
+# 実行モード: sequential（順次）/ concurrent（ベクトル類似度をワーカースレッドで並行計算）
+EXECUTION_MODES = ('sequential', 'concurrent')
+
+_stage_executor: Optional[ThreadPoolExecutor] = None
+_stage_executor_lock = threading.Lock()
+
+
+def _submit_stage(fn, *args) -> Future:
+    """採点ステージをワーカースレッドで実行（トレースのコンテキストを引き継ぐ）"""
+    global _stage_executor
+    if _stage_executor is None:
+        with _stage_executor_lock:
+            if _stage_executor is None:
+                workers = int(os.environ.get('QUIZ_STAGE_WORKERS', '2'))
+                _stage_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-stage')
+    return _stage_executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+# 採点モード: full（全指標）/ cascade（安い指標から計算し、グレード確定で打ち切り）
+SCORING_MODES = ('full', 'cascade')
+
+SCORE_REQUESTS = REGISTRY.counter(
+    'quiz_score_requests_total', 'score_translation calls by outcome', ['outcome'])
+SCORE_LATENCY = REGISTRY.histogram(
+    'quiz_score_latency_seconds', 'End-to-end score_translation latency')
+SCORE_GRADES = REGISTRY.counter(
+    'quiz_score_grades_total', 'Scored answers by grade', ['grade'])
+PREVIEW_REQUESTS = REGISTRY.counter(
+    'quiz_preview_requests_total', 'preview_score calls (as-you-type lexical preview)')
+PREVIEW_LATENCY = REGISTRY.histogram(
+    'quiz_preview_latency_seconds', 'preview_score latency (fallback translator + lexical metrics)')
+CASCADE_SKIPS = REGISTRY.counter(
+    'quiz_cascade_skipped_metrics_total', 'Metrics skipped by cascade scoring', ['metric'])
+JAPANESE_PREFILTERED = REGISTRY.counter(
+    'quiz_japanese_prefiltered_total', 'Answers scored from Japanese n-gram similarity alone (translation skipped)')
+
 class JapaneseToEnglishSystem:
-    def __init__(self):
+    def __init__(self, collect_timings: Optional[bool] = None, scoring_mode: Optional[str] = None,
+                 embeddings_backend: Optional[str] = None, execution_mode: Optional[str] = None,
+                 seed_result_memo: bool = True):
         self.current_question = None
         self.score_history = []
+        # ステージ別レイテンシ計測（None の場合は環境変数 QUIZ_COLLECT_TIMINGS に従う）
+        self.collect_timings = timings_enabled_by_default() if collect_timings is None else collect_timings
+
+        # 採点モード（None の場合は環境変数 QUIZ_SCORING_MODE、デフォルトは full）
+        self.scoring_mode = scoring_mode or os.environ.get('QUIZ_SCORING_MODE', 'full')
+        if self.scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {self.scoring_mode} (choose from {SCORING_MODES})")
+        # 実行モード（None の場合は環境変数 QUIZ_EXECUTION_MODE、デフォルトは sequential）
+        self.execution_mode = execution_mode or os.environ.get('QUIZ_EXECUTION_MODE', 'sequential')
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {self.execution_mode} (choose from {EXECUTION_MODES})")
+
+        # cascade でベクトル類似度が取り得ると仮定する範囲（実測で校正すると省略率が上がる）
+        self.cascade_vector_bounds = self._parse_vector_bounds(os.environ.get('QUIZ_CASCADE_VECTOR_BOUNDS'))
         self.sample_questions = self._load_sample_questions()
 
-        # ベクトル埋め込みモデルの初期化
-        if EMBEDDINGS_AVAILABLE:
+        # モデルサーバー（QUIZ_MODEL_SERVER_SOCKET）が指定されていれば埋め込み・翻訳を委譲
+        model_server_socket = os.environ.get('QUIZ_MODEL_SERVER_SOCKET')
+        self.model_server = ModelServerClient(model_server_socket) if model_server_socket else None
+
+        # ベクトル埋め込みモデルの初期化（None の場合は環境変数 QUIZ_EMBEDDINGS_BACKEND に従う）
+        default_backend = 'remote' if self.model_server else 'distilbert'
+        self.embeddings_backend = embeddings_backend or os.environ.get('QUIZ_EMBEDDINGS_BACKEND', default_backend)
+        if self.embeddings_backend not in EMBEDDINGS_BACKENDS:
+            raise ValueError(f"Unknown embeddings backend: {self.embeddings_backend} (choose from {EMBEDDINGS_BACKENDS})")
+        self.embeddings = self._load_embeddings(self.embeddings_backend, self.model_server)
+        self.use_embeddings = self.embeddings is not None
+        if self.use_embeddings:
+            print("[AI MODE] Vector similarity calculation available")
+
+        # 共有メモリに公開された正解英文のベクトル（QUIZ_SHARED_REFERENCES）があれば encode を省略
+        self.reference_store = self._attach_reference_store(os.environ.get('QUIZ_SHARED_REFERENCES'))
+        self._reference_texts = {
+            q['id']: self._clean_english_text(q['english_reference']) for q in self.sample_questions
+        }
+        self._reference_ids = {text: question_id for question_id, text in self._reference_texts.items()}
+        self._questions_by_id = {q['id']: q for q in self.sample_questions}
+        # 問題バンクに保存された正解英文のトークンIDを登録（encode 時のトークナイズを省略）
+        pin_reference_tokens(self.sample_questions, self._clean_english_text)
+        # フリー練習用の近傍検索インデックス（初回利用時に構築、同じ問題バンクのセッション間で共有）
+        self._bank_version = text_hash('\n'.join(
+            f"{question_id}\t{text}" for question_id, text in sorted(self._reference_texts.items())))
+
+        # 日本語文同士の文字 n-gram 類似度（QUIZ_JAPANESE_WEIGHT で総合スコアに加算、
+        # QUIZ_JAPANESE_PREFILTER 未満の回答は翻訳せずに採点）
+        self.japanese_weight = japanese_weight_from_env()
+        self.japanese_prefilter = prefilter_threshold_from_env()
+        self._japanese_index: Optional[JapaneseNgramIndex] = None
+        self._japanese_index_lock = threading.Lock()
+        if self.japanese_weight > 0 or self.japanese_prefilter is not None:
+            self.japanese_index()
+
+        # 翻訳モデルの初期化 (モデルサーバー or Google翻訳)
+        if self.model_server:
             try:
-                self.embeddings = EnglishEmbeddings()
-                self.use_embeddings = True
-                print("[AI MODE] Vector similarity calculation available")
+                self.translator = RemoteTranslator(self.model_server, self.translate_japanese_to_english_mock)
+                self.use_ai_translation = self.translator.available
             except Exception as e:
-                self.embeddings = None
-                self.use_embeddings = False
-                print(f"[WARNING] Failed to initialize embedding model: {e}")
-        else:
-            self.embeddings = None
-            self.use_embeddings = False
-
-        # 翻訳モデルの初期化 (Google翻訳のみ使用)
-        if GOOGLE_TRANSLATOR_AVAILABLE:
+                self.translator = None
+                self.use_ai_translation = False
+                print(f"[WARNING] Model server translator not available: {e}")
+        elif GOOGLE_TRANSLATOR_AVAILABLE:
             try:
                 self.translator = GoogleTranslator()
                 self.use_ai_translation = self.translator.available
@@ -66,10 +203,97 @@ class JapaneseToEnglishSystem:
             self.use_ai_translation = False
             print("[WARNING] Google Translate not available")
 
+        # QUIZ_METRICS_PORT / QUIZ_METRICS_FILE が設定されていればメトリクスを公開
+        start_exporters_from_env()
+
+        # 各問題の模範解答（元の日本語）で結果メモを事前に埋める（全問題を翻訳するため、
+        # 起動時間を段階別に測る場合は seed_result_memo=False にして後から _seed_result_memo を呼ぶ）
+        if seed_result_memo:
+            self._seed_result_memo()
+
         print("Japanese to English Translation System initialized")
 
-    def _load_sample_questions(self) -> List[Dict]:
+    @staticmethod
+    def _load_embeddings(backend: str, model_server: Optional[ModelServerClient] = None):
+        """
+        指定されたバックエンドの埋め込みモデルを読み込み（失敗時は None で軽量モード）
+
+        モデルはプロセス内で共有され、QUIZ_EMBEDDING_BATCHING が有効なら
+        全セッションの encode をまとめるマイクロバッチ経由で提供されます。
+        実行中の同一 encode 要求は単一実行にまとめられます（QUIZ_SINGLE_FLIGHT）。
+        QUIZ_MODEL_IDLE_TTL_S が設定されていれば、アイドル時に解放され次の要求で再読み込みされます。
+        """
+        if backend == 'none':
+            return None
+        if backend == 'distilbert' and not EMBEDDINGS_AVAILABLE:
+            return None
+        if backend == 'remote':
+            # サーバー側でバッチ・共有するためクライアントはそのまま使う
+            try:
+                embeddings = RemoteEmbeddings(model_server or ModelServerClient())
+            except Exception as e:
+                print(f"[WARNING] Model server embeddings not available: {e}")
+                return None
+            if single_flight_enabled_by_default():
+                embeddings = CoalescingEmbeddings(embeddings, f"remote:{embeddings.client.socket_path}")
+            return embeddings
+
+        with _shared_embeddings_lock:
+            if backend in _shared_embeddings:
+                return _shared_embeddings[backend]
+
+            try:
+                if backend == 'static':
+                    loader = StaticWordEmbeddings
+                else:
+                    from english_embeddings import EnglishEmbeddings
+                    loader = EnglishEmbeddings
+                embeddings = managed_embeddings_from_env(backend, loader)
+            except Exception as e:
+                print(f"[WARNING] Failed to initialize embedding model: {e}")
+                return None
+
+            if batching_enabled_by_default():
+                embeddings = batcher_from_env(embeddings)
+            # 同時に届いた同一テキストの encode は1回にまとめる
+            if single_flight_enabled_by_default():
+                embeddings = CoalescingEmbeddings(embeddings, backend)
+
+            _shared_embeddings[backend] = embeddings
+            return embeddings
+
+    def _attach_reference_store(self, name: Optional[str]) -> Optional[SharedReferenceStore]:
+        """共有参照ベクトルに接続（未公開・次元不一致なら None）"""
+        if not name or not self.use_embeddings:
+            return None
+        try:
+            store = SharedReferenceStore(name)
+        except FileNotFoundError:
+            print(f"[WARNING] Shared reference vectors '{name}' not published; encoding references per request")
+            return None
+        if store.generation and store.dimension != self.embeddings.dimension:
+            print(f"[WARNING] Shared reference vectors '{name}' have {store.dimension} dimensions "
+                  f"but the embedding model has {self.embeddings.dimension}; ignoring them")
+            return None
+        print(f"[SHARED REFS] Attached to '{name}' (generation {store.generation}, {len(store.index)} references)")
+        return store
+
+    @staticmethod
+    def _parse_vector_bounds(value: Optional[str]) -> Tuple[float, float]:
+        """"low,high" 形式の範囲を解析（省略時は 0.0〜1.0）"""
+        if not value:
+            return (0.0, 1.0)
+        low, high = (float(v) for v in value.split(','))
+        return (low, high)
+
+    @staticmethod
+    def _load_sample_questions() -> List[Dict]:
         """サンプル問題を読み込み"""
+        # 取り込み済みの問題バンク（python question_bank.py ingest で作成）があればそちらを使う
+        bank_path = os.environ.get('QUIZ_QUESTION_BANK')
+        if bank_path:
+            return load_question_bank(bank_path)
+
         return [
             {
                 "id": 1,
@@ -202,11 +426,13 @@ class JapaneseToEnglishSystem:
     def translate_japanese_to_english(self, japanese_text: str) -> str:
         """日本語を英訳（Google翻訳 or AI翻訳 or モック翻訳）"""
         if self.use_ai_translation and self.translator:
-            return self.translator.translate(japanese_text)
+            # 他セッションで同じ日本語を翻訳中ならその結果を待つ
+            return coalesced_translate(self.translator, japanese_text)
         else:
             return self.translate_japanese_to_english_mock(japanese_text)
 
-    def translate_japanese_to_english_mock(self, japanese_text: str) -> str:
+    @staticmethod
+    def translate_japanese_to_english_mock(japanese_text: str) -> str:
         """
         日本語を英訳するモック関数
         実際のシステムでは翻訳APIを使用
@@ -397,40 +623,49 @@ class JapaneseToEnglishSystem:
             # フォールバック: 基本翻訳を返す
             return basic_translation.lower()
 
-    def calculate_english_similarity(self, translated_text: str, reference_text: str) -> Dict:
-        """英文同士の類似度を計算"""
+    def calculate_english_similarity(self, translated_text: str, reference_text: str, timer=None,
+                                     vector_future: Optional[Future] = None,
+                                     use_vector: Optional[bool] = None,
+                                     japanese_similarity: Optional[float] = None) -> Dict:
+        """
+        英文同士の類似度を計算
+
+        timer を渡すと呼び出し元の計測に各ステージを記録します。
+        vector_future には先行して開始したベクトル類似度の計算を渡せます。
+        use_vector=False ではベクトル類似度を使わず字句指標のみで採点します。
+        japanese_similarity（日本語文同士の n-gram 類似度）を渡すと、
+        QUIZ_JAPANESE_WEIGHT の重みで総合スコアに加えます（他の重みは比例して縮小）。
+        """
+        use_vector = self.use_embeddings if use_vector is None else (use_vector and self.use_embeddings)
+        own_timer = timer is None
+        if own_timer:
+            timer = new_timer(self.collect_timings)
 
         # 前処理
         trans_clean = self._clean_english_text(translated_text)
         ref_clean = self._clean_english_text(reference_text)
+        timer.lap('clean')
 
-        # 1. 単語レベルの類似度
-        word_similarity, word_details = self._calculate_word_similarity(trans_clean, ref_clean)
-
-        # 2. 文字列類似度
-        string_similarity = self._calculate_string_similarity(trans_clean, ref_clean)
+        if self.scoring_mode == 'cascade':
+            metrics = self._compute_metrics_cascade(trans_clean, ref_clean, timer, vector_future, use_vector,
+                                                    japanese_similarity)
+        else:
+            metrics = self._compute_metrics_full(trans_clean, ref_clean, timer, vector_future, use_vector)
 
-        # 3. 構造類似度
-        structure_similarity = self._calculate_structure_similarity(trans_clean, ref_clean)
+        # 先行計算が不要になった場合は取り消す
+        if vector_future is not None and 'vector' in metrics['skipped']:
+            vector_future.cancel()
 
-        # 4. ベクトル類似度（AIモード）
-        vector_similarity = 0.0
-        if self.use_embeddings:
-            try:
-                vector_similarity = self.embeddings.calculate_similarity(trans_clean, ref_clean)
-            except Exception as e:
-                print(f"ベクトル類似度計算エラー: {e}")
-                vector_similarity = 0.0
+        vector_similarity = metrics['vector']
+        word_similarity = metrics['word']
+        string_similarity = metrics['string']
+        structure_similarity = metrics['structure']
+        word_details = metrics['word_details']
 
         # 総合スコア計算（4つの指標を使用）
-        if self.use_embeddings and vector_similarity > 0:
+        if use_vector and vector_similarity > 0:
             # AIモード: ベクトル類似度も含める
-            weights = {
-                'vector': 0.4,    # ベクトル類似度 (40%)
-                'word': 0.3,      # 単語類似度 (30%)
-                'string': 0.2,    # 文字列類似度 (20%)
-                'structure': 0.1  # 構造類似度 (10%)
-            }
+            weights = dict(AI_WEIGHTS)
             final_score = (
                 vector_similarity * weights['vector'] +
                 word_similarity * weights['word'] +
@@ -439,18 +674,12 @@ class JapaneseToEnglishSystem:
             )
         else:
             # 軽量モード: ベクトル類似度なし
-            weights = {
-                'word': 0.5,      # 単語類似度 (50%)
-                'string': 0.3,    # 文字列類似度 (30%)
-                'structure': 0.2  # 構造類似度 (20%)
-            }
-            final_score = (
-                word_similarity * weights['word'] +
-                string_similarity * weights['string'] +
-                structure_similarity * weights['structure']
-            )
+            weights = dict(LIGHTWEIGHT_WEIGHTS)
+            final_score = self._lexical_score(word_similarity, string_similarity, structure_similarity)
 
-        return {
+        weights, final_score = self._blend_japanese(weights, final_score, japanese_similarity)
+
+        result = {
             'final_score': final_score,
             'vector_similarity': vector_similarity,
             'word_similarity': word_similarity,
@@ -460,10 +689,248 @@ class JapaneseToEnglishSystem:
             'translated_clean': trans_clean,
             'reference_clean': ref_clean,
             'weights': weights,
-            'ai_mode': self.use_embeddings
+            'ai_mode': use_vector,
+            'scoring_mode': self.scoring_mode,
+            'execution_mode': self.execution_mode,
+            'skipped_metrics': metrics['skipped']
+        }
+        if japanese_similarity is not None:
+            result['japanese_similarity'] = japanese_similarity
+        for name in metrics['skipped']:
+            CASCADE_SKIPS.labels(name).inc()
+
+        # 単独で呼ばれた場合のみここで計測を確定
+        if own_timer and timer.enabled:
+            timings = timer.finish()
+            STAGE_TIMINGS.record(timings)
+            result['timings'] = timings
+
+        return result
+
+    @staticmethod
+    def _lexical_score(word_similarity: float, string_similarity: float, structure_similarity: float) -> float:
+        """字句指標のみの総合スコア（軽量モードの重み）"""
+        return (
+            word_similarity * LIGHTWEIGHT_WEIGHTS['word'] +
+            string_similarity * LIGHTWEIGHT_WEIGHTS['string'] +
+            structure_similarity * LIGHTWEIGHT_WEIGHTS['structure']
+        )
+
+    def _blend_japanese(self, weights: Dict[str, float], final_score: float,
+                        japanese_similarity: Optional[float]) -> Tuple[Dict[str, float], float]:
+        """日本語側の類似度を加える場合は英文側の重みを (1 - w) 倍に縮小"""
+        if japanese_similarity is None or self.japanese_weight <= 0:
+            return weights, final_score
+        weights = {name: weight * (1 - self.japanese_weight) for name, weight in weights.items()}
+        weights['japanese'] = self.japanese_weight
+        return weights, final_score * (1 - self.japanese_weight) + japanese_similarity * self.japanese_weight
+
+    def _compute_metrics_full(self, trans_clean: str, ref_clean: str, timer,
+                              vector_future: Optional[Future] = None, use_vector: bool = True) -> Dict:
+        """全指標を計算（従来の採点）"""
+        # 並行モードではベクトル類似度（torch は GIL を解放する）を先に投入し、字句指標と重ねる
+        if vector_future is None and use_vector and self.execution_mode == 'concurrent':
+            vector_future = _submit_stage(self._calculate_vector_similarity, trans_clean, ref_clean)
+
+        # 1. 単語レベルの類似度
+        word_similarity, word_details = self._calculate_word_similarity(trans_clean, ref_clean)
+        timer.lap('word')
+
+        # 2. 文字列類似度
+        string_similarity = self._calculate_string_similarity(trans_clean, ref_clean)
+        timer.lap('string')
+
+        # 3. 構造類似度
+        structure_similarity = self._calculate_structure_similarity(trans_clean, ref_clean)
+        timer.lap('structure')
+
+        # 4. ベクトル類似度（AIモード）
+        vector_similarity = 0.0
+        if use_vector:
+            vector_similarity = self._resolve_vector_similarity(trans_clean, ref_clean, vector_future)
+            timer.lap('vector')
+
+        return {
+            'word': word_similarity,
+            'word_details': word_details,
+            'string': string_similarity,
+            'structure': structure_similarity,
+            'vector': vector_similarity,
+            'skipped': [],
+        }
+
+    def _compute_metrics_cascade(self, trans_clean: str, ref_clean: str, timer,
+                                 vector_future: Optional[Future] = None, use_vector: bool = True,
+                                 japanese_similarity: Optional[float] = None) -> Dict:
+        """
+        安い指標から順に計算し、グレードが確定した時点で残りを省略する
+
+        省略した指標には取り得る範囲の中央値を入れるため、重み付きスコアは
+        必ず確定したグレードの範囲内に収まります。
+        """
+        # 構造・単語類似度は安価なので常に計算（単語分析の表示にも必要）
+        structure_similarity = self._calculate_structure_similarity(trans_clean, ref_clean)
+        timer.lap('structure')
+        word_similarity, word_details = self._calculate_word_similarity(trans_clean, ref_clean)
+        timer.lap('word')
+
+        metrics = {
+            'word': word_similarity,
+            'word_details': word_details,
+            'structure': structure_similarity,
+            'skipped': [],
+        }
+
+        # 完全一致: 文字列・ベクトル類似度は 1.0 で確定
+        if trans_clean and trans_clean == ref_clean:
+            metrics['string'] = 1.0
+            metrics['vector'] = 1.0 if use_vector else 0.0
+            metrics['skipped'] = ['string', 'vector'] if use_vector else ['string']
+            return metrics
+
+        vector_bounds = self.cascade_vector_bounds if use_vector else None
+        intervals = {
+            'word': (word_similarity, word_similarity),
+            'structure': (structure_similarity, structure_similarity),
         }
 
-    def _clean_english_text(self, text: str) -> str:
+        # 文字列類似度の上限（quick_ratio は ratio 以上であることが保証される）
+        matcher = SequenceMatcher(None, trans_clean, ref_clean)
+        intervals['string'] = (0.0, matcher.quick_ratio())
+        if self._grade_band_decided(intervals, vector_bounds, japanese_similarity):
+            timer.lap('string')
+            return self._fill_skipped(metrics, intervals, vector_bounds, ['string', 'vector'])
+
+        metrics['string'] = matcher.ratio()
+        intervals['string'] = (metrics['string'], metrics['string'])
+        timer.lap('string')
+
+        if not use_vector:
+            metrics['vector'] = 0.0
+            return metrics
+
+        if self._grade_band_decided(intervals, vector_bounds, japanese_similarity):
+            return self._fill_skipped(metrics, intervals, vector_bounds, ['vector'])
+
+        # グレードが曖昧な場合のみベクトル類似度を計算
+        metrics['vector'] = self._resolve_vector_similarity(trans_clean, ref_clean, vector_future)
+        timer.lap('vector')
+        return metrics
+
+    def _fill_skipped(self, metrics: Dict, intervals: Dict, vector_bounds, skipped: List[str]) -> Dict:
+        """省略した指標に範囲の中央値を設定"""
+        if 'string' in skipped:
+            low, high = intervals['string']
+            metrics['string'] = (low + high) / 2
+        if vector_bounds is not None:
+            metrics['vector'] = (vector_bounds[0] + vector_bounds[1]) / 2
+        else:
+            metrics['vector'] = 0.0
+            skipped = [name for name in skipped if name != 'vector']
+        metrics['skipped'] = skipped
+        return metrics
+
+    def _score_interval(self, intervals: Dict, vector_bounds,
+                        japanese_similarity: Optional[float] = None) -> Tuple[float, float]:
+        """未確定の指標の範囲から総合スコアの取り得る範囲を求める"""
+        low, high = self._english_score_interval(intervals, vector_bounds)
+        if japanese_similarity is not None and self.japanese_weight > 0:
+            # 日本語側の類似度は確定済みなので、範囲は (1 - w) 倍に縮む
+            w = self.japanese_weight
+            return low * (1 - w) + japanese_similarity * w, high * (1 - w) + japanese_similarity * w
+        return low, high
+
+    def _english_score_interval(self, intervals: Dict, vector_bounds) -> Tuple[float, float]:
+        """英文側の指標だけで計算した総合スコアの取り得る範囲"""
+        def weighted(weights, pick):
+            return sum(weights[name] * pick(intervals[name]) for name in ('word', 'string', 'structure'))
+
+        light_low = weighted(LIGHTWEIGHT_WEIGHTS, lambda r: r[0])
+        light_high = weighted(LIGHTWEIGHT_WEIGHTS, lambda r: r[1])
+        if vector_bounds is None:
+            return light_low, light_high
+
+        vec_low, vec_high = vector_bounds
+        ai_low = weighted(AI_WEIGHTS, lambda r: r[0]) + AI_WEIGHTS['vector'] * max(vec_low, 0.0)
+        ai_high = weighted(AI_WEIGHTS, lambda r: r[1]) + AI_WEIGHTS['vector'] * vec_high
+        if vec_low > 0:
+            return ai_low, ai_high
+        # ベクトル類似度が 0 以下なら軽量モードの重みで採点される
+        return min(ai_low, light_low), max(ai_high, light_high)
+
+    def _grade_band_decided(self, intervals: Dict, vector_bounds,
+                            japanese_similarity: Optional[float] = None) -> bool:
+        """スコア範囲の上限と下限が同じグレードに入るか"""
+        low, high = self._score_interval(intervals, vector_bounds, japanese_similarity)
+        return self._grade_for_score(int(low * 100))[0] == self._grade_for_score(int(high * 100))[0]
+
+    def _resolve_vector_similarity(self, trans_clean: str, ref_clean: str,
+                                   vector_future: Optional[Future]) -> float:
+        """先行計算があればその結果を待ち、無ければその場で計算"""
+        if vector_future is not None:
+            return vector_future.result()
+        return self._calculate_vector_similarity(trans_clean, ref_clean)
+
+    def _calculate_vector_similarity(self, trans_clean: str, ref_clean: str) -> float:
+        """ベクトル類似度（失敗時は 0.0）"""
+        try:
+            reference_vector = self._reference_vector(ref_clean)
+            if reference_vector is None:
+                return self.embeddings.calculate_similarity(trans_clean, ref_clean)
+
+            # 正解側は正規化済みの共有ベクトルを使い、回答側だけを encode
+            vector = self.embeddings.encode([trans_clean])[0]
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return 0.0
+            return float(np.dot(vector, reference_vector) / norm)
+        except ModelUnloaded as e:
+            # 再読み込みが終わるまでは字句指標のみ（軽量モードの重み）で採点
+            tracing.debug("ベクトル類似度をスキップ: %s", e)
+            return 0.0
+        except Exception as e:
+            tracing.warning("ベクトル類似度計算エラー: %s", e)
+            return 0.0
+
+    def _reference_vector(self, ref_clean: str) -> Optional[np.ndarray]:
+        """共有メモリ上の正解英文ベクトル（新しい世代が公開されていれば付け替える）"""
+        store = self.reference_store
+        if store is None:
+            return None
+        question_id = self._reference_ids.get(ref_clean)
+        if question_id is None:
+            return None
+        store.refresh()
+        if store.dimension != self.embeddings.dimension:
+            return None
+        return store.vector(question_id, ref_clean)
+
+    def similarity_to_many(self, english_text: str, reference_ids: List[int]) -> Optional[np.ndarray]:
+        """1つの英文と複数の問題の正解英文のベクトル類似度（reference_ids の順、埋め込みが無ければ None）"""
+        if not self.use_embeddings:
+            return None
+        text = self._clean_english_text(english_text)
+
+        # 共有メモリに全件の正規化済みベクトルがあれば回答側だけを encode
+        store = self.reference_store
+        if store is not None:
+            store.refresh()
+            if store.dimension == self.embeddings.dimension:
+                stored = [store.vector(question_id, self._reference_text(question_id))
+                          for question_id in reference_ids]
+                if stored and all(vector is not None for vector in stored):
+                    query = self.embeddings.encode([text])
+                    return cosine_matrix(query, np.stack(stored), references_normalized=True)[0]
+
+        references = [self._reference_text(question_id) for question_id in reference_ids]
+        return self.embeddings.similarity_matrix([text], references)[0]
+
+    def _reference_text(self, question_id: int) -> str:
+        """問題IDのクリーニング済み正解英文"""
+        return self._reference_texts[question_id]
+
+    @staticmethod
+    def _clean_english_text(text: str) -> str:
         """英文をクリーニング"""
         # 小文字化
         text = text.lower().strip()
@@ -473,10 +940,12 @@ class JapaneseToEnglishSystem:
         text = re.sub(r'[^\w\s]', '', text)
         return text
 
-    def _calculate_word_similarity(self, text1: str, text2: str) -> Tuple[float, Dict]:
-        """単語レベルの類似度計算"""
+    def _calculate_word_similarity(self, text1: str, text2: str,
+                                   words2: Optional[frozenset] = None) -> Tuple[float, Dict]:
+        """単語レベルの類似度計算（words2 は text2 の単語集合、事前計算済みなら渡す）"""
         words1 = set(text1.split())
-        words2 = set(text2.split())
+        if words2 is None:
+            words2 = set(text2.split())
 
         common_words = words1 & words2
         all_words = words1 | words2
@@ -501,9 +970,11 @@ class JapaneseToEnglishSystem:
         """文字列類似度計算"""
         return SequenceMatcher(None, text1, text2).ratio()
 
-    def _calculate_structure_similarity(self, text1: str, text2: str) -> float:
-        """構造類似度計算（文長などの基本的な特徴）"""
-        len1, len2 = len(text1.split()), len(text2.split())
+    def _calculate_structure_similarity(self, text1: str, text2: str, len2: Optional[int] = None) -> float:
+        """構造類似度計算（文長などの基本的な特徴、len2 は text2 の単語数）"""
+        len1 = len(text1.split())
+        if len2 is None:
+            len2 = len(text2.split())
 
         if max(len1, len2) == 0:
             return 1.0
@@ -514,7 +985,80 @@ class JapaneseToEnglishSystem:
 
     def score_translation(self, user_japanese: str) -> Dict:
         """日本語入力を評価"""
+        # 負荷に応じた採点段階（QUIZ_SLO_P95_MS 未設定なら常に full）
+        tier = DEGRADATION.enter() if DEGRADATION else 'full'
+        start = time.perf_counter()
+        with tracing.span('score_translation', tier=tier) as span:
+            try:
+                result = self._score_translation(user_japanese, tier)
+            except Exception:
+                SCORE_REQUESTS.labels('error').inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                SCORE_LATENCY.observe(elapsed)
+                if DEGRADATION:
+                    DEGRADATION.exit(elapsed, tier)
+            result['request_id'] = span.request_id
+            result['tier'] = tier
+            span.set(score=result['score'], grade=result['grade'])
+
+        if 'japanese_input' in result:
+            SCORE_REQUESTS.labels('scored').inc()
+            SCORE_GRADES.labels(result['grade']).inc()
+        else:
+            SCORE_REQUESTS.labels('rejected').inc()
+        return result
+
+    def preview_score(self, user_japanese: str, question: Optional[Dict] = None) -> Dict:
+        """
+        入力中のプレビュー採点（辞書ベースの翻訳 + 字句指標のみ、モデルは呼ばない）
+
+        正式な採点（score_translation）とは別物で、履歴・結果メモ・劣化制御には影響しません。
+        """
+        start = time.perf_counter()
+        question = question or self.current_question
+        if not question or not user_japanese.strip():
+            return {'score': 0, 'grade': 'F', 'preview': True, 'translated_english': ''}
+
+        translated_english = self.translate_japanese_to_english_mock(user_japanese)
+        trans_clean = self._clean_english_text(translated_english)
+        ref_clean, ref_words, ref_length = self._reference_profile(question)
+
+        # 正式な採点と同じ字句指標・重み（日本語側の類似度が有効ならそれも）で計算
+        word_similarity, _ = self._calculate_word_similarity(trans_clean, ref_clean, ref_words)
+        string_similarity = self._calculate_string_similarity(trans_clean, ref_clean)
+        structure_similarity = self._calculate_structure_similarity(trans_clean, ref_clean, ref_length)
+        final_score = self._lexical_score(word_similarity, string_similarity, structure_similarity)
+        _, final_score = self._blend_japanese(
+            LIGHTWEIGHT_WEIGHTS, final_score, self._japanese_similarity_if_enabled(user_japanese, question))
+
+        score = int(final_score * 100)
+        PREVIEW_REQUESTS.inc()
+        PREVIEW_LATENCY.observe(time.perf_counter() - start)
+        return {
+            'score': score,
+            'grade': self._grade_for_score(score)[0],
+            'preview': True,
+            'translated_english': translated_english,
+            'word_similarity': word_similarity,
+            'string_similarity': string_similarity,
+            'structure_similarity': structure_similarity,
+        }
 
+    def _reference_profile(self, question: Dict) -> Tuple[str, frozenset, int]:
+        """正解英文のクリーニング結果・単語集合・単語数（問題IDごとにプロセス内でキャッシュ）"""
+        reference_english = question['english_reference']
+        profile = _reference_profiles.get(question['id'])
+        # 同じIDで正解英文が異なる問題バンクが読み込まれた場合は作り直す
+        if profile is None or profile[0] != reference_english:
+            ref_clean = self._clean_english_text(reference_english)
+            ref_words = ref_clean.split()
+            profile = (reference_english, ref_clean, frozenset(ref_words), len(ref_words))
+            _reference_profiles[question['id']] = profile
+        return profile[1:]
+
+    def _score_translation(self, user_japanese: str, tier: str = 'full') -> Dict:
         if not user_japanese.strip():
             return {
                 'score': 0,
@@ -523,10 +1067,6 @@ class JapaneseToEnglishSystem:
                 'details': {}
             }
 
-        # 日本語を英訳（AI翻訳 or モック翻訳）
-        translated_english = self.translate_japanese_to_english(user_japanese)
-
-        # 現在の問題の正解英文と比較
         if not self.current_question:
             return {
                 'score': 0,
@@ -535,33 +1075,53 @@ class JapaneseToEnglishSystem:
                 'details': {}
             }
 
+        # 同じ問題・同じ回答の採点結果があれば再利用
+        memo_key = self._memo_key(self.current_question, user_japanese)
+        cached = RESULT_MEMO.get(memo_key)
+        if cached is not None:
+            result = dict(cached, japanese_input=user_japanese, question=self.current_question, memo_hit=True)
+            self.score_history.append(result)
+            return result
+
+        timer = new_timer(self.collect_timings)
+
+        # 日本語文同士の類似度（翻訳不要で安価）。事前フィルタ未満なら翻訳・埋め込みを省略
+        japanese_similarity = self._japanese_similarity_if_enabled(user_japanese, self.current_question)
+        if japanese_similarity is not None:
+            timer.lap('japanese')
+            if self.japanese_prefilter is not None and japanese_similarity < self.japanese_prefilter:
+                return self._prefiltered_result(user_japanese, japanese_similarity, memo_key, timer)
+
+        # 日本語を英訳（AI翻訳 or モック翻訳。高負荷時は辞書ベースの翻訳に切り替え）
+        if tier == 'full':
+            translated_english = self.translate_japanese_to_english(user_japanese)
+        else:
+            translated_english = self.translate_japanese_to_english_mock(user_japanese)
+        timer.lap('translate')
+        use_vector = self.use_embeddings and tier != 'lexical'
+
+        # 現在の問題の正解英文と比較
         reference_english = self.current_question['english_reference']
 
+        # 並行モード: 翻訳が終わった時点でベクトル類似度の計算を開始
+        # （cascade は省略できる可能性があるため先行計算しない）
+        vector_future = None
+        if use_vector and self.execution_mode == 'concurrent' and self.scoring_mode == 'full':
+            vector_future = _submit_stage(
+                self._calculate_vector_similarity,
+                self._clean_english_text(translated_english),
+                self._clean_english_text(reference_english)
+            )
+
         # 英文同士で類似度計算
-        similarity_result = self.calculate_english_similarity(translated_english, reference_english)
+        similarity_result = self.calculate_english_similarity(
+            translated_english, reference_english, timer, vector_future, use_vector, japanese_similarity)
 
         # スコア化（0-100）
         score = int(similarity_result['final_score'] * 100)
 
         # グレード判定
-        if score >= 90:
-            grade = 'S'
-            feedback = '素晴らしい！完璧な翻訳です。'
-        elif score >= 80:
-            grade = 'A'
-            feedback = '非常に良い翻訳です！'
-        elif score >= 70:
-            grade = 'B'
-            feedback = '良い翻訳です。いくつか改善点があります。'
-        elif score >= 60:
-            grade = 'C'
-            feedback = 'まずまずです。もう少し正確に翻訳しましょう。'
-        elif score >= 40:
-            grade = 'D'
-            feedback = '意味は伝わっていますが、改善が必要です。'
-        else:
-            grade = 'F'
-            feedback = '翻訳の精度が低いです。再度チャレンジしましょう。'
+        grade, feedback = self._grade_for_score(score)
 
         result = {
             'score': score,
@@ -574,10 +1134,229 @@ class JapaneseToEnglishSystem:
             'question': self.current_question
         }
 
+        # 軽くした段階の結果（モデル再読み込み中の字句指標のみの採点を含む）は再利用しない
+        degraded = use_vector and 'vector' not in similarity_result['weights']
+        if tier == 'full' and not degraded:
+            RESULT_MEMO.put(memo_key, self._memo_entry(result))
+
+        if timer.enabled:
+            timings = timer.finish()
+            STAGE_TIMINGS.record(timings)
+            result['timings'] = timings
+
         self.score_history.append(result)
 
         return result
 
+    def _prefiltered_result(self, user_japanese: str, japanese_similarity: float, memo_key: Tuple, timer) -> Dict:
+        """日本語側の類似度が事前フィルタの閾値未満: 翻訳せずにその類似度だけで採点"""
+        JAPANESE_PREFILTERED.inc()
+        tracing.debug("日本語類似度 %.3f < %.3f のため翻訳を省略", japanese_similarity, self.japanese_prefilter)
+        score = int(japanese_similarity * 100)
+        grade, feedback = self._grade_for_score(score)
+        result = {
+            'score': score,
+            'grade': grade,
+            'feedback': feedback,
+            'japanese_input': user_japanese,
+            'translated_english': '',
+            'reference_english': self.current_question['english_reference'],
+            'similarity_details': {
+                'final_score': japanese_similarity,
+                'japanese_similarity': japanese_similarity,
+                'vector_similarity': 0.0,
+                'word_similarity': 0.0,
+                'string_similarity': 0.0,
+                'structure_similarity': 0.0,
+                'weights': {'japanese': 1.0},
+                'ai_mode': False,
+                'scoring_mode': self.scoring_mode,
+                'execution_mode': self.execution_mode,
+                'skipped_metrics': ['word', 'string', 'structure', 'vector'],
+                'prefiltered': True,
+            },
+            'question': self.current_question
+        }
+        RESULT_MEMO.put(memo_key, self._memo_entry(result))
+        if timer.enabled:
+            timings = timer.finish()
+            STAGE_TIMINGS.record(timings)
+            result['timings'] = timings
+        self.score_history.append(result)
+        return result
+
+    def japanese_index(self) -> JapaneseNgramIndex:
+        """問題の日本語文の文字 n-gram TF-IDF 索引（初回利用時に構築）"""
+        with self._japanese_index_lock:
+            if self._japanese_index is None:
+                self._japanese_index = JapaneseNgramIndex(self.sample_questions)
+            return self._japanese_index
+
+    def japanese_similarity(self, user_japanese: str, question: Optional[Dict] = None) -> float:
+        """学習者の日本語と問題の日本語文の類似度（0.0〜1.0、翻訳・モデル不要）"""
+        question = question or self.current_question
+        if not question:
+            return 0.0
+        return self.japanese_index().similarity(user_japanese, question['id'])
+
+    def _japanese_similarity_if_enabled(self, user_japanese: str, question: Dict) -> Optional[float]:
+        """重み・事前フィルタのどちらも無効なら計算しない（None）"""
+        if self.japanese_weight <= 0 and self.japanese_prefilter is None:
+            return None
+        return self.japanese_similarity(user_japanese, question)
+
+    def reference_index(self) -> Optional[ReferenceIndex]:
+        """
+        正解英文ベクトルの近傍検索インデックス（埋め込みが無ければ None）
+
+        インデックスはプロセス内で問題バンクごとに1つだけ作り、全セッションで共有します。
+        共有参照ベクトルを使う場合は、新しい世代が公開されていれば作り直します。
+        """
+        if not self.use_embeddings:
+            return None
+        store = self.reference_store
+        key = (self.embeddings_backend, store.name if store is not None else None, self._bank_version)
+        with _reference_indexes_lock:
+            generation = 0
+            if store is not None:
+                store.refresh()
+                generation = store.generation
+            cached = _reference_indexes.get(key)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+
+            # 別の問題バンクから公開された行列（正解英文が一致しない）は使わない
+            if (generation and store.dimension == self.embeddings.dimension
+                    and store.matches(self._reference_texts)):
+                # 共有メモリ上の正規化済み行列をそのまま使う（コピーなし）
+                index = index_from_env(store.ids, store.matrix, normalized=True)
+            else:
+                ids = [q['id'] for q in self.sample_questions]
+                vectors = self.embeddings.encode([self._reference_texts[question_id] for question_id in ids])
+                index = index_from_env(ids, vectors)
+            _reference_indexes[key] = (generation, index)
+            return index
+
+    def find_nearest_questions(self, english_text: str, k: int = 3) -> List[Tuple[Dict, float]]:
+        """英文に最も近い問題を類似度の高い順に最大 k 件（埋め込みが無ければ単語類似度で全件走査）"""
+        text = self._clean_english_text(english_text)
+        index = query = None
+        try:
+            index = self.reference_index()
+            if index is not None:
+                query = self.embeddings.encode([text])
+        except ModelUnloaded as e:
+            tracing.debug("近傍検索を単語類似度で代替: %s", e)
+        if query is not None:
+            matches = index.search(query, k)[0]
+        else:
+            matches = sorted(
+                ((q['id'], self._calculate_word_similarity(text, *self._reference_profile(q)[:2])[0])
+                 for q in self.sample_questions),
+                key=lambda match: match[1], reverse=True)[:k]
+        return [(self._questions_by_id[question_id], similarity)
+                for question_id, similarity in matches if question_id in self._questions_by_id]
+
+    def score_free_form(self, user_japanese: str, k: int = 3) -> Dict:
+        """フリー練習: 任意の日本語を英訳し、最も近い問題の正解英文と比較して採点"""
+        start = time.perf_counter()
+        with tracing.span('score_free_form') as span:
+            if not user_japanese.strip():
+                SCORE_REQUESTS.labels('rejected').inc()
+                return {'score': 0, 'grade': 'F', 'feedback': '回答が入力されていません。', 'details': {}}
+
+            translated_english = self.translate_japanese_to_english(user_japanese)
+            matches = self.find_nearest_questions(translated_english, k)
+            if not matches:
+                SCORE_REQUESTS.labels('rejected').inc()
+                return {'score': 0, 'grade': 'F', 'feedback': '比較できる問題がありません。', 'details': {},
+                        'free_form': True, 'request_id': span.request_id}
+            question = matches[0][0]
+
+            similarity_result = self.calculate_english_similarity(
+                translated_english, question['english_reference'],
+                japanese_similarity=self._japanese_similarity_if_enabled(user_japanese, question))
+            score = int(similarity_result['final_score'] * 100)
+            grade, feedback = self._grade_for_score(score)
+            SCORE_LATENCY.observe(time.perf_counter() - start)
+            span.set(score=score, grade=grade, matched_question=question['id'])
+
+        result = {
+            'score': score,
+            'grade': grade,
+            'feedback': feedback,
+            'japanese_input': user_japanese,
+            'translated_english': translated_english,
+            'reference_english': question['english_reference'],
+            'similarity_details': similarity_result,
+            'question': question,
+            'matches': [{'id': q['id'], 'japanese': q['japanese'], 'similarity': similarity}
+                        for q, similarity in matches],
+            'free_form': True,
+            'request_id': span.request_id,
+        }
+        SCORE_REQUESTS.labels('scored').inc()
+        SCORE_GRADES.labels(grade).inc()
+        self.score_history.append(result)
+        return result
+
+    def scoring_config_version(self) -> str:
+        """採点結果に影響する設定をまとめたバージョン文字列"""
+        translator = type(self.translator).__name__ if self.translator else 'mock'
+        embeddings = self.embeddings_backend if self.use_embeddings else 'none'
+        bounds = ','.join(str(b) for b in self.cascade_vector_bounds)
+        japanese = f"ja{self.japanese_weight},{self.japanese_prefilter}"
+        return f"v{SCORING_CONFIG_VERSION}:{self.scoring_mode}:{translator}:{embeddings}:{bounds}:{japanese}"
+
+    def _memo_key(self, question: Dict, user_japanese: str) -> Tuple:
+        return (question['id'], normalize_japanese_answer(user_japanese), self.scoring_config_version())
+
+    @staticmethod
+    def _memo_entry(result: Dict) -> Dict:
+        """回答者に依存しない部分だけを保存"""
+        return {
+            key: result[key]
+            for key in ('score', 'grade', 'feedback', 'translated_english',
+                        'reference_english', 'similarity_details')
+        }
+
+    def _seed_result_memo(self):
+        """各問題の日本語原文を採点してメモに登録（同じ設定ではプロセスで一度だけ）"""
+        if not RESULT_MEMO.enabled or not RESULT_MEMO.mark_seeded(self.scoring_config_version()):
+            return
+
+        for question in self.sample_questions:
+            translated = self.translate_japanese_to_english(question['japanese'])
+            similarity = self.calculate_english_similarity(
+                translated, question['english_reference'],
+                japanese_similarity=self._japanese_similarity_if_enabled(question['japanese'], question))
+            score = int(similarity['final_score'] * 100)
+            grade, feedback = self._grade_for_score(score)
+            RESULT_MEMO.put(self._memo_key(question, question['japanese']), {
+                'score': score,
+                'grade': grade,
+                'feedback': feedback,
+                'translated_english': translated,
+                'reference_english': question['english_reference'],
+                'similarity_details': similarity,
+            })
+
+    @staticmethod
+    def _grade_for_score(score: int) -> Tuple[str, str]:
+        """スコアからグレードとフィードバックを判定"""
+        if score >= 90:
+            return 'S', '素晴らしい！完璧な翻訳です。'
+        elif score >= 80:
+            return 'A', '非常に良い翻訳です！'
+        elif score >= 70:
+            return 'B', '良い翻訳です。いくつか改善点があります。'
+        elif score >= 60:
+            return 'C', 'まずまずです。もう少し正確に翻訳しましょう。'
+        elif score >= 40:
+            return 'D', '意味は伝わっていますが、改善が必要です。'
+        else:
+            return 'F', '翻訳の精度が低いです。再度チャレンジしましょう。'
+
     def get_statistics(self) -> Dict:
         """統計情報を取得"""
         if not self.score_history:
@@ -626,4 +1405,8 @@ if __name__ == "__main__":
     print(f"グレード: {result['grade']}")
     print(f"フィードバック: {result['feedback']}")
     print(f"翻訳結果: {result['translated_english']}")
-    print(f"正解英文: {result['reference_english']}")
\ No newline at end of file
+    print(f"正解英文: {result['reference_english']}")
+
+    if 'timings' in result:
+        print("\n⏱️ ステージ別レイテンシ:")
+        print(STAGE_TIMINGS.format_table())
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""
+Concurrent-user Load Test
+複数の学習者を同時に模擬して採点パイプラインに負荷をかけ、スループット・レイテンシ・エラー率・RSS の推移を計測する
+
+システムを直接呼ぶ（1ユーザー = 1セッション = 1つの JapaneseToEnglishSystem、モデルはプロセスで共有）:
+    python load_test.py system --users 20 --duration 60 --think-ms 3000
+    python load_test.py system --users 20 --duration 60 --arrival-rate 15     # オープンループ
+
+Streamlit アプリを HTTP（WebSocket）経由で叩く（事前に streamlit run app.py で起動しておく）:
+    python load_test.py http --url http://127.0.0.1:8501 --users 10 --duration 60 --server-pid <PID>
+
+回答は問題バンク（QUIZ_QUESTION_BANK）から benchmark.generate_answer_corpus で作った
+正解・言い換え・途中切れ・無関係などの分布から選びます。外部ネットワークにはアクセスしません。
+
+オープンループでは到着時刻をポアソン過程で決め、レイテンシは到着予定時刻から測ります
+（処理が詰まっても要求の発生が遅れないため、待ち行列での待ち時間も含まれます）。
+"""
+import argparse
+import contextlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmark import generate_answer_corpus, peak_rss_mb
+from stage_timings import percentile
+
+with contextlib.redirect_stdout(sys.stderr):
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+
+def rss_mb(pid: Optional[int] = None) -> float:
+    """現在の RSS（MB、/proc が無ければこのプロセスのピーク RSS）"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb() if pid is None else 0.0
+
+
+class LoadRecorder:
+    """完了した要求の記録と、一定間隔ごとの推移（スループット・p95・エラー・RSS）"""
+
+    def __init__(self, interval: float = 1.0, rss_pid: Optional[int] = None):
+        self.interval = interval
+        self.rss_pid = rss_pid
+        self._lock = threading.Lock()
+        self._records: List[tuple] = []
+        self._timeline: List[Dict] = []
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name='load-sampler', daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def record(self, latency: float, service: float, ok: bool):
+        with self._lock:
+            self._records.append((time.perf_counter() - self._started, latency, service, ok))
+
+    def _sample(self):
+        index = 0
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                window = self._records[index:]
+                index = len(self._records)
+            latencies = sorted(r[1] for r in window)
+            point = {
+                't': round(time.perf_counter() - self._started, 1),
+                'completed': len(window),
+                'throughput_per_s': len(window) / self.interval,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'errors': sum(1 for r in window if not r[3]),
+                'rss_mb': rss_mb(self.rss_pid),
+            }
+            self._timeline.append(point)
+            print(f"[LOAD] t={point['t']:>6.1f}s  {point['throughput_per_s']:6.1f} req/s  "
+                  f"p95 {point['p95_ms']:7.1f}ms  errors {point['errors']}  rss {point['rss_mb']:.0f}MB",
+                  file=sys.stderr)
+
+    def summary(self, elapsed: float) -> Dict:
+        with self._lock:
+            records = list(self._records)
+        latencies = sorted(r[1] for r in records)
+        services = sorted(r[2] for r in records)
+        errors = sum(1 for r in records if not r[3])
+        return {
+            'requests': len(records),
+            'errors': errors,
+            'error_rate': errors / len(records) if records else 0.0,
+            'throughput_per_s': len(records) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 50) * 1000,
+                'p95': percentile(latencies, 95) * 1000,
+                'p99': percentile(latencies, 99) * 1000,
+                'max': latencies[-1] * 1000 if latencies else 0.0,
+            },
+            'service_ms': {
+                'p50': percentile(services, 50) * 1000,
+                'p95': percentile(services, 95) * 1000,
+            },
+            'timeline': list(self._timeline),
+        }
+
+
+class SystemSession:
+    """プロセス内のシステムを直接呼ぶ学習者（Streamlit のセッションと同じく1人1インスタンス）"""
+
+    def __init__(self):
+        with contextlib.redirect_stdout(sys.stderr):
+            self.system = JapaneseToEnglishSystem()
+
+    def answer(self, item: Dict) -> bool:
+        self.system.current_question = item['question']
+        result = self.system.score_translation(item['answer'])
+        # 履歴が伸び続けてメモリ計測を歪めないようにする
+        self.system.score_history.clear()
+        return 'score' in result and 'translated_english' in result
+
+
+class StreamlitSession:
+    """Streamlit アプリの WebSocket（/_stcore/stream）に接続し、ブラウザと同じ BackMsg で操作する学習者"""
+
+    ANSWER_LABEL = "あなたの日本語を入力:"
+    SUBMIT_LABEL = "📝 採点する"
+    SKIP_LABEL = "⏭️ スキップ"
+
+    def __init__(self, url: str, corpus_by_reference: Dict[str, List[Dict]], rng: random.Random,
+                 timeout: float = 60.0):
+        from websockets.sync.client import connect
+
+        stream_url = url.rstrip('/').replace('http://', 'ws://').replace('https://', 'wss://') + '/_stcore/stream'
+        self.ws = connect(stream_url, subprotocols=['streamlit'], max_size=None, open_timeout=timeout)
+        self.corpus_by_reference = corpus_by_reference
+        self.rng = rng
+        self.timeout = timeout
+        self._render()
+
+    def _rerun(self, widgets=()) -> List:
+        """スクリプトを再実行し、st.rerun() による再実行も含めて完了までの要素を集める"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.widget_states.widgets.extend(widgets)
+        self.ws.send(message.SerializeToString())
+
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=self.timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                elements.append(forward.delta.new_element)
+            elif kind == 'new_session':
+                elements = []
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("app script failed to compile")
+                return elements
+
+    def _render(self, widgets=()) -> List:
+        elements = self._rerun(widgets)
+        self.widget_ids = {}
+        self.reference = None
+        for element in elements:
+            kind = element.WhichOneof('type')
+            if kind == 'code':
+                # 採点結果にも st.code（回答・単語一覧など）が並ぶため、既知の正解英文と一致する最初のものを採る
+                if self.reference is None and element.code.code_text in self.corpus_by_reference:
+                    self.reference = element.code.code_text
+            elif kind in ('text_area', 'button'):
+                widget = getattr(element, kind)
+                self.widget_ids[widget.label] = widget.id
+        return elements
+
+    def answer(self, item: Dict) -> bool:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        # 画面に出ている問題に対する回答を、同じ問題の回答分布から選ぶ
+        candidates = self.corpus_by_reference.get(self.reference) or [item]
+        answer = self.rng.choice(candidates)['answer']
+        elements = self._render([
+            WidgetState(id=self.widget_ids[self.ANSWER_LABEL], string_value=answer),
+            WidgetState(id=self.widget_ids[self.SUBMIT_LABEL], trigger_value=True),
+        ])
+        scored = any(e.WhichOneof('type') == 'metric' and e.metric.label == "スコア" for e in elements)
+        return scored
+
+    def next_question(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        self._render([WidgetState(id=self.widget_ids[self.SKIP_LABEL], trigger_value=True)])
+
+    def close(self):
+        self.ws.close()
+
+
+def _think(rng: random.Random, think_ms: float, distribution: str) -> float:
+    if think_ms <= 0:
+        return 0.0
+    if distribution == 'fixed':
+        return think_ms / 1000
+    return rng.expovariate(1000 / think_ms)
+
+
+def run_load_test(mode: str = 'system', users: int = 10, duration: float = 30.0, think_ms: float = 2000,
+                  think_distribution: str = 'exp', arrival_rate: Optional[float] = None,
+                  corpus_size: int = 500, seed: int = 0, url: str = 'http://127.0.0.1:8501',
+                  server_pid: Optional[int] = None, interval: float = 1.0) -> Dict:
+    """
+    users 人の学習者で duration 秒間負荷をかける
+
+    arrival_rate を指定するとオープンループ（到着はポアソン過程、users は同時処理できる学習者数）、
+    省略するとクローズドループ（各学習者が回答 → 思考時間 → 回答 を繰り返す）。
+    """
+    questions = JapaneseToEnglishSystem._load_sample_questions()
+    corpus = generate_answer_corpus(questions, corpus_size, seed)
+    # 画面の正解英文から問題を特定するため、コーパスに無い問題も模範解答で登録しておく
+    corpus_by_reference: Dict[str, List[Dict]] = {q['english_reference']: [] for q in questions}
+    for item in corpus:
+        corpus_by_reference[item['question']['english_reference']].append(item)
+    for question in questions:
+        if not corpus_by_reference[question['english_reference']]:
+            corpus_by_reference[question['english_reference']].append(
+                {'question': question, 'answer': question['japanese']})
+
+    def new_session(rng: random.Random):
+        if mode == 'http':
+            return StreamlitSession(url, corpus_by_reference, rng)
+        return SystemSession()
+
+    rngs = [random.Random(seed * 1000 + user) for user in range(users)]
+    sessions = [new_session(rng) for rng in rngs]
+    recorder = LoadRecorder(interval, rss_pid=server_pid if mode == 'http' else None)
+    deadline = time.perf_counter() + duration
+    arrivals: queue.Queue = queue.Queue()
+
+    def submit(session, rng: random.Random, scheduled: float):
+        start = time.perf_counter()
+        try:
+            ok = session.answer(rng.choice(corpus))
+        except Exception as e:
+            print(f"[LOAD] Request failed: {e}", file=sys.stderr)
+            ok = False
+        finished = time.perf_counter()
+        recorder.record(finished - scheduled, finished - start, ok)
+        if mode == 'http' and ok:
+            try:
+                session.next_question()
+            except Exception as e:
+                print(f"[LOAD] Skip failed: {e}", file=sys.stderr)
+
+    def closed_loop_user(user: int):
+        rng, session = rngs[user], sessions[user]
+        # 全員が同時に始めないよう最初の思考時間をずらす
+        time.sleep(rng.uniform(0, think_ms / 1000))
+        while time.perf_counter() < deadline:
+            submit(session, rng, time.perf_counter())
+            time.sleep(_think(rng, think_ms, think_distribution))
+
+    def open_loop_user(user: int):
+        rng, session = rngs[user], sessions[user]
+        while True:
+            scheduled = arrivals.get()
+            if scheduled is None:
+                return
+            submit(session, rng, scheduled)
+
+    target = closed_loop_user if arrival_rate is None else open_loop_user
+    threads = [threading.Thread(target=target, args=(user,), name=f'user-{user}', daemon=True)
+               for user in range(users)]
+    recorder.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    if arrival_rate is not None:
+        arrival_rng = random.Random(seed)
+        next_arrival = time.perf_counter()
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put(next_arrival)
+            next_arrival += arrival_rng.expovariate(arrival_rate)
+        for _ in threads:
+            arrivals.put(None)
+
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    recorder.stop()
+    for session in sessions:
+        if mode == 'http':
+            session.close()
+
+    report = recorder.summary(elapsed)
+    report['meta'] = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': mode,
+        'users': users,
+        'duration_s': duration,
+        'elapsed_s': elapsed,
+        'loop': 'closed' if arrival_rate is None else 'open',
+        'think_ms': think_ms if arrival_rate is None else None,
+        'think_distribution': think_distribution if arrival_rate is None else None,
+        'arrival_rate_per_s': arrival_rate,
+        'corpus_size': corpus_size,
+        'seed': seed,
+        'target': url if mode == 'http' else None,
+        'rss_source': (f"pid {server_pid}" if server_pid else 'none') if mode == 'http' else 'self',
+    }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the scoring pipeline")
+    sub = parser.add_subparsers(dest='mode', required=True)
+    for name, help_text in (('system', "JapaneseToEnglishSystem をプロセス内で直接呼ぶ"),
+                            ('http', "起動済みの Streamlit アプリを WebSocket 経由で操作")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument('--users', type=int, default=10, help="同時に操作する学習者数")
+        command.add_argument('--duration', type=float, default=30.0, help="負荷をかける秒数")
+        command.add_argument('--think-ms', type=float, default=2000, help="回答間の平均思考時間（クローズドループ）")
+        command.add_argument('--think-distribution', default='exp', choices=['exp', 'fixed'])
+        command.add_argument('--arrival-rate', type=float, default=None,
+                             help="1秒あたりの到着数（指定するとオープンループ）")
+        command.add_argument('--corpus-size', type=int, default=500, help="回答分布の元になる合成回答の件数")
+        command.add_argument('--seed', type=int, default=0)
+        command.add_argument('--interval', type=float, default=1.0, help="推移を記録する間隔（秒）")
+        command.add_argument('--output', default=None, help="JSON の出力先（省略時は標準出力）")
+    sub.choices['http'].add_argument('--url', default='http://127.0.0.1:8501')
+    sub.choices['http'].add_argument('--server-pid', type=int, default=None,
+                                     help="RSS を記録する Streamlit サーバーのプロセスID")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(
+        args.mode, args.users, args.duration, args.think_ms, args.think_distribution, args.arrival_rate,
+        args.corpus_size, args.seed, getattr(args, 'url', None), getattr(args, 'server_pid', None), args.interval)
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"[LOAD] Results written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
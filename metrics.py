@@ -0,0 +1,421 @@
+"""
+Lightweight In-process Metrics Registry
+カウンタ・ゲージ・固定バケットのヒストグラムと Prometheus テキスト形式での公開
+
+ホットパスでロックを取らないよう、カウンタとヒストグラムはスレッドごとの
+セルに書き込み、収集時（render）にだけ合算します。
+"""
+import functools
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# レイテンシ用のデフォルトバケット（秒）
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _CellOwner:
+    """スレッドローカルに置くセルの持ち主（スレッド終了時に回収される）"""
+
+    __slots__ = ('cell', '__weakref__')
+
+    def __init__(self, cell: list):
+        self.cell = cell
+
+
+class _ThreadCells:
+    """スレッドごとの書き込みセル（生成・回収時のみロック）
+
+    終了したスレッドのセルは基準値に合算して破棄するため、スレッドを次々に
+    作り直す環境（Streamlit の再実行など）でもセルの数は生存スレッド数に留まります。
+    """
+
+    def __init__(self, factory: Callable[[], list]):
+        self._factory = factory
+        self._local = threading.local()
+        self._base = factory()
+        self._cells: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def cell(self) -> list:
+        owner = getattr(self._local, 'owner', None)
+        if owner is None:
+            owner = _CellOwner(self._factory())
+            self._local.owner = owner
+            with self._lock:
+                self._cells[id(owner.cell)] = owner.cell
+            weakref.finalize(owner, self._retire, owner.cell)
+        return owner.cell
+
+    def _retire(self, cell: list):
+        """終了したスレッドのセルを基準値に合算"""
+        with self._lock:
+            for i, value in enumerate(cell):
+                self._base[i] += value
+            self._cells.pop(id(cell), None)
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [list(self._base)] + [list(cell) for cell in self._cells.values()]
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _ThreadCells(lambda: [0.0])
+
+    def inc(self, amount: float = 1.0):
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        return sum(cell[0] for cell in self._cells.snapshot())
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        # 単純な代入はGILの下でアトミック
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self._value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        # [bucket_0, ..., bucket_n, +Inf, sum]
+        size = len(buckets) + 2
+        self._cells = _ThreadCells(lambda: [0.0] * size)
+
+    def observe(self, value: float):
+        cell = self._cells.cell()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def time(self):
+        """with 文で経過時間を observe"""
+        return _Timer(self.observe)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(累積バケット, 合計, 件数)"""
+        totals = [0.0] * (len(self._buckets) + 2)
+        for cell in self._cells.snapshot():
+            for i, value in enumerate(cell):
+                totals[i] += value
+        cumulative = []
+        running = 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1], running
+
+
+class _Timer:
+    def __init__(self, observe: Callable[[float], None]):
+        self._observe = observe
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric:
+    """ラベル付きメトリクスの共通部分"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child(self, key: Tuple[str, ...]):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def labels(self, *values, **kwargs):
+        """ラベル値に対応する子メトリクスを取得"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+        return self._child(values)
+
+    def children(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self.children():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {_format_value(child.value())}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def value(self) -> float:
+        return self._default.value()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def value(self) -> float:
+        return self._default.value()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _render_child(self, key, child) -> List[str]:
+        cumulative, total, count = child.snapshot()
+        lines = []
+        bounds = [_format_value(b) for b in self.buckets] + ['+Inf']
+        for bound, value in zip(bounds, cumulative):
+            lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', bound))} {_format_value(value)}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {_format_value(count)}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if not math.isfinite(value):
+        return '+Inf' if value > 0 else ('-Inf' if value < 0 else 'NaN')
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """メトリクスの登録と Prometheus テキスト形式での出力"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus テキスト形式（version 0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """node_exporter の textfile collector 向けにアトミックに書き出す"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# プロセス全体で共有するレジストリ
+REGISTRY = MetricsRegistry()
+
+
+# 翻訳バックエンド共通のメトリクス（backend ラベルで区別）
+TRANSLATE_REQUESTS = REGISTRY.counter(
+    'quiz_translate_requests_total', 'Translator calls', ['backend'])
+TRANSLATE_FALLBACKS = REGISTRY.counter(
+    'quiz_translate_fallbacks_total', 'Translator calls served by the fallback dictionary', ['backend'])
+TRANSLATE_LATENCY = REGISTRY.histogram(
+    'quiz_translate_latency_seconds', 'Translator call latency', ['backend'])
+
+
+def timed(histogram, counter=None):
+    """関数呼び出しの回数とレイテンシを記録するデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if counter is not None:
+                counter.inc()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+_server_lock = threading.Lock()
+_servers: Dict[Tuple[str, int], ThreadingHTTPServer] = {}
+
+
+def start_http_server(port: int, addr: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY):
+    """/metrics を返すHTTPサーバーをデーモンスレッドで起動（同じポートは一度だけ）"""
+    with _server_lock:
+        if (addr, port) in _servers:
+            return _servers[(addr, port)]
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), _Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name=f"metrics-http-{port}", daemon=True)
+        thread.start()
+        _servers[(addr, port)] = server
+        print(f"[METRICS] Prometheus endpoint on http://{addr}:{port}/metrics")
+        return server
+
+
+def start_textfile_writer(path: str, interval: float = 15.0, registry: MetricsRegistry = REGISTRY):
+    """interval 秒ごとにメトリクスをファイルへ書き出すデーモンスレッドを起動"""
+    def loop():
+        while True:
+            try:
+                registry.write_textfile(path)
+            except OSError as e:
+                print(f"[METRICS] Failed to write {path}: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+    thread.start()
+    return thread
+
+
+_exporters_started = False
+
+
+def start_exporters_from_env():
+    """QUIZ_METRICS_PORT / QUIZ_METRICS_FILE が設定されていれば公開を開始（プロセスで一度だけ）"""
+    global _exporters_started
+    with _server_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    port = os.environ.get('QUIZ_METRICS_PORT')
+    if port:
+        try:
+            start_http_server(int(port), os.environ.get('QUIZ_METRICS_ADDR', '127.0.0.1'))
+        except (OSError, ValueError) as e:
+            print(f"[METRICS] Failed to start HTTP exporter on port {port}: {e}")
+
+    path = os.environ.get('QUIZ_METRICS_FILE')
+    if path:
+        start_textfile_writer(path, float(os.environ.get('QUIZ_METRICS_INTERVAL', '15')))
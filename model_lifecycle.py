@@ -0,0 +1,199 @@
+"""
+Model Lifecycle Manager
+一定時間使われなかったモデルをメモリから解放し、次の要求で裏で再読み込みする
+
+再読み込みが終わるまでの要求は軽量モード（ベクトル類似度なし・辞書ベース翻訳）で処理します。
+QUIZ_MODEL_IDLE_TTL_S で解放までの秒数を設定（未設定なら常駐のまま）。
+QUIZ_EMBEDDING_WARM_STANDBY=1 で埋め込みモデルだけは解放せず待機させます。
+"""
+import gc
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+import tracing
+from metrics import REGISTRY
+from vector_similarity import EncoderSimilarity
+
+MODEL_LOADED = REGISTRY.gauge(
+    'quiz_model_loaded', 'Whether a managed model is resident (1) or evicted (0)', ['model'])
+MODEL_LOADS = REGISTRY.counter(
+    'quiz_model_loads_total', 'Managed model loads (initial and on-demand reloads)', ['model'])
+MODEL_EVICTIONS = REGISTRY.counter(
+    'quiz_model_evictions_total', 'Managed models unloaded after the idle TTL', ['model'])
+MODEL_UNAVAILABLE = REGISTRY.counter(
+    'quiz_model_unavailable_total', 'Requests served without a model because it was being reloaded', ['model'])
+
+
+class ModelUnloaded(RuntimeError):
+    """モデルが解放済み（再読み込み中）"""
+
+
+class ManagedModel:
+    """アイドル時に解放され、次の要求で非同期に再読み込みされるモデル"""
+
+    def __init__(self, name: str, loader: Callable, idle_ttl: float, warm_standby: bool = False):
+        self.name = name
+        self.loader = loader
+        self.idle_ttl = idle_ttl
+        self.warm_standby = warm_standby
+        self._lock = threading.Lock()
+        self._loading = False
+        self._model = None
+        self.last_used = time.monotonic()
+        # 起動時は同期的に読み込む（失敗は呼び出し元に伝える）
+        self._install(loader())
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        """モデルを返す（解放済みなら再読み込みを開始して None）"""
+        with self._lock:
+            self.last_used = time.monotonic()
+            model = self._model
+            if model is None and not self._loading:
+                self._loading = True
+                threading.Thread(target=self._reload, name=f"reload-{self.name}", daemon=True).start()
+        if model is None:
+            MODEL_UNAVAILABLE.labels(self.name).inc()
+        return model
+
+    def _install(self, model):
+        with self._lock:
+            self._model = model
+            self._loading = False
+        MODEL_LOADS.labels(self.name).inc()
+        MODEL_LOADED.labels(self.name).set(1)
+
+    def _reload(self):
+        started = time.perf_counter()
+        try:
+            model = self.loader()
+        except Exception as e:
+            tracing.warning("[LIFECYCLE] Failed to reload %s: %s", self.name, e)
+            with self._lock:
+                self._loading = False
+            return
+        self._install(model)
+        tracing.warning("[LIFECYCLE] Reloaded %s in %.1fs", self.name, time.perf_counter() - started)
+
+    def evict_if_idle(self, now: float) -> bool:
+        """TTL を超えて使われていなければ解放（warm standby は対象外）"""
+        if self.warm_standby:
+            return False
+        with self._lock:
+            if self._model is None or now - self.last_used < self.idle_ttl:
+                return False
+            self._model = None
+        gc.collect()
+        MODEL_EVICTIONS.labels(self.name).inc()
+        MODEL_LOADED.labels(self.name).set(0)
+        tracing.warning("[LIFECYCLE] Evicted %s after %.0fs idle", self.name, now - self.last_used)
+        return True
+
+
+class ModelLifecycleManager:
+    """登録されたモデルを定期的に見回り、アイドルなものを解放する"""
+
+    def __init__(self):
+        self._models: List[ManagedModel] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, model: ManagedModel) -> ManagedModel:
+        with self._lock:
+            self._models.append(model)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="model-lifecycle", daemon=True)
+                self._thread.start()
+        return model
+
+    def _run(self):
+        while True:
+            with self._lock:
+                models = list(self._models)
+            interval = min((m.idle_ttl for m in models), default=60) / 4
+            time.sleep(min(max(interval, 1.0), 60.0))
+            now = time.monotonic()
+            for model in models:
+                model.evict_if_idle(now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = list(self._models)
+        now = time.monotonic()
+        return {
+            m.name: {'loaded': m.loaded, 'idle_seconds': now - m.last_used, 'warm_standby': m.warm_standby}
+            for m in models
+        }
+
+
+LIFECYCLE = ModelLifecycleManager()
+
+
+def idle_ttl_from_env() -> Optional[float]:
+    """環境変数 QUIZ_MODEL_IDLE_TTL_S（未設定なら解放しない）"""
+    value = os.environ.get('QUIZ_MODEL_IDLE_TTL_S')
+    return float(value) if value else None
+
+
+class ManagedEmbeddings(EncoderSimilarity):
+    """解放・再読み込みされる埋め込みモデル（解放中の encode は ModelUnloaded）"""
+
+    def __init__(self, managed: ManagedModel):
+        self.managed = managed
+        self.dimension = managed.get().dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """複数の英文をベクトル化"""
+        model = self.managed.get()
+        if model is None:
+            raise ModelUnloaded(f"{self.managed.name} is reloading")
+        return model.encode(texts)
+
+
+class ManagedTranslator:
+    """解放・再読み込みされる翻訳モデル（解放中は fallback で翻訳）"""
+
+    def __init__(self, managed: ManagedModel, fallback: Callable[[str], str]):
+        self.managed = managed
+        self.fallback = fallback
+        self.available = True
+
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        return ('managed', self.managed.name)
+
+    def translate(self, japanese_text: str) -> str:
+        """日本語を英語に翻訳"""
+        model = self.managed.get()
+        if model is None:
+            return self.fallback(japanese_text)
+        return model.translate(japanese_text)
+
+
+def managed_embeddings_from_env(name: str, loader: Callable):
+    """QUIZ_MODEL_IDLE_TTL_S が設定されていれば解放対象の埋め込みモデルとして読み込む"""
+    ttl = idle_ttl_from_env()
+    if ttl is None:
+        return loader()
+    warm_standby = os.environ.get('QUIZ_EMBEDDING_WARM_STANDBY', '').lower() in ('1', 'true', 'yes', 'on')
+    managed = LIFECYCLE.register(ManagedModel(f"embeddings:{name}", loader, ttl, warm_standby))
+    print(f"[LIFECYCLE] {managed.name} idle TTL {ttl:.0f}s" + (" (warm standby)" if warm_standby else ""))
+    return ManagedEmbeddings(managed)
+
+
+def managed_translator_from_env(name: str, loader: Callable, fallback: Callable[[str], str]):
+    """QUIZ_MODEL_IDLE_TTL_S が設定されていれば解放対象の翻訳モデルとして読み込む（warm standby なし）"""
+    ttl = idle_ttl_from_env()
+    if ttl is None:
+        return loader()
+    managed = LIFECYCLE.register(ManagedModel(f"translator:{name}", loader, ttl))
+    print(f"[LIFECYCLE] {managed.name} idle TTL {ttl:.0f}s")
+    return ManagedTranslator(managed, fallback)
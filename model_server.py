@@ -0,0 +1,337 @@
+"""
+Local Model Server over a Unix Domain Socket
+EnglishEmbeddings / LocalAITranslator を1プロセスで保持し、UIワーカーに提供するモデルサーバー
+
+起動:
+    python model_server.py --socket /tmp/quiz-models.sock --embeddings distilbert --translator marian
+
+UIワーカー側:
+    QUIZ_MODEL_SERVER_SOCKET=/tmp/quiz-models.sock streamlit run app.py
+
+フレーム形式（ビッグエンディアン）:
+    要求  [op:uint8][length:uint32][payload]
+    応答  [status:uint8][length:uint32][payload]   status 0=成功 1=エラー（payload はメッセージ）
+
+    文字列リスト  [count:uint32] ([length:uint32][utf-8])...
+    ベクトル      [rows:uint32][dim:uint32][float32 little-endian の生バイト列]
+"""
+import argparse
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+import tracing
+from metrics import TRANSLATE_FALLBACKS
+from model_lifecycle import managed_translator_from_env
+from single_flight import coalesced_translate
+from vector_similarity import EncoderSimilarity
+
+OP_PING = 0
+OP_ENCODE = 1
+OP_SIMILARITY = 2
+OP_TRANSLATE = 3
+OP_HAS_TRANSLATOR = 4
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_HEADER = struct.Struct('!BI')
+_U32 = struct.Struct('!I')
+_MATRIX_HEADER = struct.Struct('!II')
+_F64 = struct.Struct('!d')
+
+DEFAULT_SOCKET = '/tmp/quiz-models.sock'
+
+
+# --- フレームのエンコード/デコード ---
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("socket closed")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _send_frame(sock: socket.socket, code: int, payload: bytes):
+    sock.sendall(_HEADER.pack(code, len(payload)) + payload)
+
+
+def _recv_frame(sock: socket.socket) -> Tuple[int, bytes]:
+    code, length = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return code, _recv_exact(sock, length) if length else b''
+
+
+def pack_strings(texts: List[str]) -> bytes:
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def unpack_strings(payload: bytes) -> List[str]:
+    (count,) = _U32.unpack_from(payload, 0)
+    offset = _U32.size
+    texts = []
+    for _ in range(count):
+        (length,) = _U32.unpack_from(payload, offset)
+        offset += _U32.size
+        texts.append(payload[offset:offset + length].decode('utf-8'))
+        offset += length
+    return texts
+
+
+def pack_matrix(matrix: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(matrix, dtype='<f4')
+    rows, dim = matrix.shape
+    return _MATRIX_HEADER.pack(rows, dim) + matrix.tobytes()
+
+
+def unpack_matrix(payload: bytes) -> np.ndarray:
+    rows, dim = _MATRIX_HEADER.unpack_from(payload, 0)
+    return np.frombuffer(payload, dtype='<f4', count=rows * dim, offset=_MATRIX_HEADER.size).reshape(rows, dim)
+
+
+# --- サーバー ---
+
+class _ModelRequestHandler(socketserver.BaseRequestHandler):
+    """1接続で複数の要求を順に処理（クライアントは接続を再利用する）"""
+
+    def handle(self):
+        models = self.server.models
+        while True:
+            try:
+                op, payload = _recv_frame(self.request)
+            except ConnectionError:
+                return
+
+            try:
+                if op == OP_PING:
+                    response = _U32.pack(models.dimension)
+                elif op == OP_ENCODE:
+                    response = pack_matrix(models.encode(unpack_strings(payload)))
+                elif op == OP_SIMILARITY:
+                    text1, text2 = unpack_strings(payload)
+                    response = _F64.pack(models.calculate_similarity(text1, text2))
+                elif op == OP_TRANSLATE:
+                    response = models.translate(payload.decode('utf-8')).encode('utf-8')
+                elif op == OP_HAS_TRANSLATOR:
+                    response = bytes([models.translator is not None])
+                else:
+                    raise ValueError(f"unknown op {op}")
+                _send_frame(self.request, STATUS_OK, response)
+            except Exception as e:
+                _send_frame(self.request, STATUS_ERROR, str(e).encode('utf-8'))
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ServedModels:
+    """サーバーが保持するモデル一式"""
+
+    def __init__(self, embeddings_backend: str = 'distilbert', translator: str = 'marian'):
+        from japanese_to_english_system import JapaneseToEnglishSystem
+
+        self.embeddings = JapaneseToEnglishSystem._load_embeddings(embeddings_backend)
+        self.dimension = self.embeddings.dimension if self.embeddings is not None else 0
+
+        if translator == 'marian':
+            from ai_translator import LocalAITranslator
+            # アイドル時は解放し、再読み込み中は辞書ベースの翻訳で応答
+            self.translator = managed_translator_from_env(
+                'marian', LocalAITranslator, JapaneseToEnglishSystem.translate_japanese_to_english_mock)
+        elif translator == 'google':
+            from google_translator import GoogleTranslator
+            self.translator = GoogleTranslator()
+        else:
+            self.translator = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if self.embeddings is None:
+            raise RuntimeError("embeddings not loaded on model server")
+        return self.embeddings.encode(texts)
+
+    def calculate_similarity(self, text1: str, text2: str) -> float:
+        if self.embeddings is None:
+            raise RuntimeError("embeddings not loaded on model server")
+        return self.embeddings.calculate_similarity(text1, text2)
+
+    def translate(self, text: str) -> str:
+        if self.translator is None:
+            raise RuntimeError("translator not loaded on model server")
+        return coalesced_translate(self.translator, text)
+
+
+def serve(socket_path: str, models: ServedModels):
+    """Unix ソケットで待ち受け（既存のソケットファイルは置き換える）"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = _ThreadingUnixServer(socket_path, _ModelRequestHandler)
+    server.models = models
+    os.chmod(socket_path, 0o660)
+    print(f"[MODEL SERVER] Listening on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+# --- クライアント ---
+
+class ModelServerError(RuntimeError):
+    """モデルサーバーがエラーを返した"""
+
+
+class ModelServerClient:
+    """スレッドごとに接続を保持して再利用するクライアント"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._local.sock = None
+
+    def call(self, op: int, payload: bytes = b'') -> bytes:
+        """
+        要求を送信
+
+        応答を1バイトも受け取る前に接続が切れていた場合（再利用した接続がサーバー側で
+        閉じられていたなど）だけ、一度再接続して再送します。タイムアウトや応答の途中での
+        切断は再送せずにそのまま送出します（サーバー側で処理が進んでいる可能性があるため）。
+        """
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                _send_frame(sock, op, payload)
+                first = sock.recv(1)
+                if not first:
+                    raise ConnectionError("socket closed before reply")
+            except socket.timeout:
+                self._drop_connection()
+                raise
+            except OSError:
+                self._drop_connection()
+                if attempt == 1:
+                    raise
+                continue
+            try:
+                header = first + _recv_exact(sock, _HEADER.size - 1)
+                status, length = _HEADER.unpack(header)
+                response = _recv_exact(sock, length) if length else b''
+            except OSError:
+                self._drop_connection()
+                raise
+            break
+        if status != STATUS_OK:
+            raise ModelServerError(response.decode('utf-8', errors='replace'))
+        return response
+
+    def ping(self) -> int:
+        """接続確認（埋め込みの次元数を返す）"""
+        return _U32.unpack(self.call(OP_PING))[0]
+
+    def has_translator(self) -> bool:
+        """サーバーに翻訳モデルが読み込まれているか"""
+        return self.call(OP_HAS_TRANSLATOR) == b'\x01'
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return unpack_matrix(self.call(OP_ENCODE, pack_strings(texts)))
+
+    def similarity(self, text1: str, text2: str) -> float:
+        return _F64.unpack(self.call(OP_SIMILARITY, pack_strings([text1, text2])))[0]
+
+    def translate(self, text: str) -> str:
+        return self.call(OP_TRANSLATE, text.encode('utf-8')).decode('utf-8')
+
+
+class RemoteEmbeddings(EncoderSimilarity):
+    """モデルサーバー上の埋め込みモデル（EnglishEmbeddings と同じインターフェース）"""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.dimension = client.ping()
+        if self.dimension == 0:
+            raise ModelServerError("model server has no embedding model loaded")
+        print(f"[REMOTE] Using embeddings from model server at {client.socket_path}")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """複数の英文をベクトル化"""
+        return self.client.encode(texts)
+
+
+class RemoteTranslator:
+    """モデルサーバー上の翻訳モデル（サーバー停止・翻訳モデル無しのときは fallback で翻訳）"""
+
+    def __init__(self, client: ModelServerClient, fallback: Optional[Callable[[str], str]] = None):
+        self.client = client
+        self.fallback = fallback
+        self.available = client.has_translator()
+        if self.available:
+            print(f"[REMOTE] Using translator from model server at {client.socket_path}")
+        else:
+            print(f"[WARNING] Model server at {client.socket_path} has no translator loaded")
+
+    @property
+    def flight_key(self) -> tuple:
+        """同じ翻訳結果になる設定（翻訳の単一実行で結果を共有するキー）"""
+        return ('remote', self.client.socket_path)
+
+    def translate(self, japanese_text: str) -> str:
+        """日本語を英語に翻訳"""
+        try:
+            return self.client.translate(japanese_text)
+        except (ModelServerError, OSError) as e:
+            if self.fallback is None:
+                raise
+            TRANSLATE_FALLBACKS.labels('remote').inc()
+            tracing.warning("モデルサーバーで翻訳できないため辞書ベースの翻訳で代替: %s", e)
+            return self.fallback(japanese_text)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local model server for the translation quiz")
+    parser.add_argument('--socket', default=os.environ.get('QUIZ_MODEL_SERVER_SOCKET', DEFAULT_SOCKET))
+    parser.add_argument('--embeddings', default='distilbert', choices=['distilbert', 'static', 'none'])
+    parser.add_argument('--translator', default='marian', choices=['marian', 'google', 'none'])
+    args = parser.parse_args(argv)
+
+    serve(args.socket, ServedModels(args.embeddings, args.translator))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
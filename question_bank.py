@@ -0,0 +1,244 @@
+"""
+Question Bank Ingest and Near-duplicate Detection
+問題バンクの取り込み時に、正解英文の埋め込みと単語 Jaccard で重複に近い問題をまとめる
+
+取り込み:
+    python question_bank.py ingest imported.jsonl questions.jsonl --embeddings static
+    QUIZ_QUESTION_BANK=questions.jsonl streamlit run app.py
+
+正解英文のトークンIDの事前計算（DistilBERT の encode でトークナイズを省略）:
+    python question_bank.py tokenize questions.jsonl questions.jsonl
+
+全ペアのコサイン類似度は block × block のタイル単位で計算し、N×N 行列は作りません。
+閾値を超えたペアは単語 Jaccard でも確認し、Union-Find でクラスタにまとめます。
+"""
+import argparse
+import json
+import re
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+DEDUP_MODES = ('flag', 'merge')
+
+
+def _read_questions(path: str) -> List[Dict]:
+    """JSON Lines（1行1問）または JSON 配列を読み込み"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def load_question_bank(path: str) -> List[Dict]:
+    """問題バンクを読み込み（重複として印の付いた問題は除く）"""
+    return [q for q in _read_questions(path) if q.get('duplicate_of') is None]
+
+
+def save_question_bank(questions: List[Dict], path: str):
+    """JSON Lines で書き出し"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for question in questions:
+            f.write(json.dumps(question, ensure_ascii=False) + '\n')
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(_WORD_PATTERN.findall(text.lower()))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def hashed_word_vectors(texts: Sequence[str], dim: int = 1024) -> np.ndarray:
+    """埋め込みモデルが無い場合の代替: 単語集合をハッシュした疎ベクトル（正規化済み）"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in _words(text):
+            matrix[row, zlib.crc32(word.encode('utf-8')) % dim] = 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+def find_near_duplicates(texts: Sequence[str], vectors: np.ndarray, cosine_threshold: float = 0.95,
+                         jaccard_threshold: float = 0.6, block: int = 2048) -> List[List[int]]:
+    """
+    重複に近いテキストのクラスタ（2件以上、各クラスタは昇順の行番号）を返す
+
+    コサイン類似度が cosine_threshold 以上かつ単語 Jaccard が jaccard_threshold 以上のペアを重複とみなします。
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+
+    n = len(texts)
+    words = [_words(text) for text in texts]
+    groups = _UnionFind(n)
+
+    # 上三角のタイルだけを計算（メモリは block × block に抑えられる）
+    for i in range(0, n, block):
+        left = vectors[i:i + block]
+        for j in range(i, n, block):
+            tile = left @ vectors[j:j + block].T
+            if i == j:
+                tile = np.triu(tile, k=1)
+            rows, cols = np.nonzero(tile >= cosine_threshold)
+            for a, b in zip(rows + i, cols + j):
+                if jaccard(words[a], words[b]) >= jaccard_threshold:
+                    groups.union(int(a), int(b))
+
+    clusters: Dict[int, List[int]] = {}
+    for row in range(n):
+        clusters.setdefault(groups.find(row), []).append(row)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def deduplicate_questions(questions: List[Dict], vectors: np.ndarray, mode: str = 'flag',
+                          **thresholds) -> Tuple[List[Dict], List[List[int]]]:
+    """
+    重複クラスタを処理した問題リストとクラスタを返す
+
+    flag: 代表（クラスタ内の先頭）以外に duplicate_of を付ける（load_question_bank が除外）
+    merge: 代表だけを残し、他の日本語文を alternate_japanese として代表にまとめる
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode: {mode} (choose from {DEDUP_MODES})")
+
+    clusters = find_near_duplicates([q['english_reference'] for q in questions], vectors, **thresholds)
+    questions = [dict(q) for q in questions]
+    dropped = set()
+    for members in clusters:
+        representative = questions[members[0]]
+        for row in members[1:]:
+            if mode == 'flag':
+                questions[row]['duplicate_of'] = representative['id']
+            else:
+                alternates = representative.setdefault('alternate_japanese', [])
+                alternates.append(questions[row]['japanese'])
+                dropped.add(row)
+
+    return [q for row, q in enumerate(questions) if row not in dropped], clusters
+
+
+def tokenize_references(questions: List[Dict], tokenizer_name: str = 'distilbert-base-uncased') -> List[Dict]:
+    """
+    正解英文（採点時と同じクリーニング後）のトークンIDを reference_tokens として付ける
+
+    読み込み時に tokenization_cache に登録され、採点時の正解英文のトークナイズが省略されます。
+    パディングはバッチごとに決まるため、attention mask は保存せず encode 時に長さから作ります。
+    """
+    from transformers import AutoTokenizer
+
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    texts = [JapaneseToEnglishSystem._clean_english_text(q['english_reference']) for q in questions]
+    token_ids = tokenizer(texts, truncation=True, max_length=512)['input_ids']
+    questions = [dict(q) for q in questions]
+    for question, ids in zip(questions, token_ids):
+        question['reference_tokens'] = {'tokenizer': tokenizer_name, 'input_ids': list(ids)}
+    return questions
+
+
+def ingest(source: str, destination: str, embeddings_backend: Optional[str] = None, mode: str = 'flag',
+           cosine_threshold: float = 0.95, jaccard_threshold: float = 0.6) -> Dict:
+    """問題を取り込み、重複を処理して書き出す"""
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+    questions = _read_questions(source)
+    for number, question in enumerate(questions, 1):
+        question.setdefault('id', number)
+        question.setdefault('topic', 'Imported')
+
+    started = time.perf_counter()
+    embeddings = JapaneseToEnglishSystem._load_embeddings(embeddings_backend) if embeddings_backend else None
+    texts = [q['english_reference'] for q in questions]
+    if embeddings is not None:
+        vectors = np.vstack([embeddings.encode(texts[i:i + 256]) for i in range(0, len(texts), 256)])
+    else:
+        print("[DEDUP] No embedding model; using hashed word vectors for candidate pairs")
+        vectors = hashed_word_vectors(texts)
+    encoded = time.perf_counter()
+
+    questions, clusters = deduplicate_questions(
+        questions, vectors, mode, cosine_threshold=cosine_threshold, jaccard_threshold=jaccard_threshold)
+    save_question_bank(questions, destination)
+
+    report = {
+        'input': len(texts),
+        'output': len([q for q in questions if q.get('duplicate_of') is None]),
+        'clusters': len(clusters),
+        'duplicates': sum(len(members) - 1 for members in clusters),
+        'encode_seconds': round(encoded - started, 3),
+        'dedup_seconds': round(time.perf_counter() - encoded, 3),
+    }
+    print(f"[DEDUP] {report['duplicates']} near-duplicates in {report['clusters']} clusters "
+          f"({report['input']} -> {report['output']} questions)")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Question bank ingest tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_parser = sub.add_parser('ingest', help="問題を取り込み、重複に近い問題をまとめて書き出す")
+    ingest_parser.add_argument('source')
+    ingest_parser.add_argument('destination')
+    ingest_parser.add_argument('--embeddings', default=None, choices=['distilbert', 'static', 'remote'],
+                               help="省略時はハッシュした単語ベクトルで候補を探す")
+    ingest_parser.add_argument('--mode', default='flag', choices=DEDUP_MODES)
+    ingest_parser.add_argument('--cosine-threshold', type=float, default=0.95)
+    ingest_parser.add_argument('--jaccard-threshold', type=float, default=0.6)
+
+    tokenize_parser = sub.add_parser('tokenize', help="正解英文のトークンIDを事前計算して書き出す")
+    tokenize_parser.add_argument('source')
+    tokenize_parser.add_argument('destination')
+    tokenize_parser.add_argument('--tokenizer', default='distilbert-base-uncased')
+    args = parser.parse_args(argv)
+
+    if args.command == 'tokenize':
+        questions = tokenize_references(_read_questions(args.source), args.tokenizer)
+        save_question_bank(questions, args.destination)
+        print(f"[TOKENIZE] {len(questions)} reference sentences tokenized with {args.tokenizer}")
+        return 0
+
+    report = ingest(args.source, args.destination, args.embeddings, args.mode,
+                    args.cosine_threshold, args.jaccard_threshold)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Nearest-reference Search Index
+正解英文ベクトルに対する top-k 近傍検索（小規模は厳密なブロック行列積、大規模は IVF クラスタ探索）
+
+ベクトルは L2 正規化済みの float32 行列として保持し、内積 = コサイン類似度で検索します。
+"""
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metrics import REGISTRY
+from vector_similarity import normalize_rows
+
+INDEX_MODES = ('auto', 'exact', 'ivf')
+
+# auto でこの件数以上なら IVF を使う
+IVF_THRESHOLD = 10000
+
+SEARCH_LATENCY = REGISTRY.histogram(
+    'quiz_reference_search_seconds', 'Nearest-reference search latency per query batch', ['mode'])
+
+
+def _merge_top_k(best_scores: np.ndarray, best_rows: np.ndarray,
+                 scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """これまでの上位 k 件と新しい候補をまとめて上位 k 件に絞る（行ごと、順不同）"""
+    all_scores = np.concatenate([best_scores, scores], axis=1)
+    all_rows = np.concatenate([best_rows, rows], axis=1)
+    if all_scores.shape[1] <= k:
+        return all_scores, all_rows
+    keep = np.argpartition(-all_scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(all_scores, keep, axis=1), np.take_along_axis(all_rows, keep, axis=1)
+
+
+class ReferenceIndex:
+    """
+    問題IDと正解英文ベクトルの近傍検索インデックス
+
+    normalized=True なら L2 正規化済みの float32 行列（共有メモリ上の行列など）をコピーせずに保持します。
+    """
+
+    def __init__(self, ids: Sequence[int], vectors: np.ndarray, mode: str = 'auto',
+                 nlist: Optional[int] = None, nprobe: int = 8, block_rows: int = 8192, seed: int = 0,
+                 normalized: bool = False):
+        if mode not in INDEX_MODES:
+            raise ValueError(f"Unknown index mode: {mode} (choose from {INDEX_MODES})")
+
+        self.ids = np.asarray(ids, dtype=np.int64)
+        if normalized and vectors.dtype == np.float32 and vectors.ndim == 2:
+            self.vectors = vectors
+        else:
+            self.vectors = normalize_rows(vectors)
+        if len(self.ids) != len(self.vectors):
+            raise ValueError(f"{len(self.ids)} ids for {len(self.vectors)} vectors")
+
+        if mode == 'auto':
+            mode = 'ivf' if len(self.ids) >= IVF_THRESHOLD else 'exact'
+        self.mode = mode
+        self.block_rows = block_rows
+        self.nprobe = nprobe
+
+        started = time.perf_counter()
+        if mode == 'ivf':
+            self._build_ivf(nlist or max(1, int(4 * np.sqrt(len(self.ids)))), seed)
+        print(f"[INDEX] Built {mode} reference index over {len(self.ids)} vectors "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _build_ivf(self, nlist: int, seed: int, iterations: int = 10, sample_size: int = 65536):
+        """球面 k-means でクラスタに分け、クラスタ順に並べ替えた行列と転置リストを作る"""
+        rng = np.random.default_rng(seed)
+        n = len(self.vectors)
+        nlist = min(nlist, n)
+
+        sample = self.vectors
+        if n > sample_size:
+            sample = self.vectors[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        # 全件を最寄りのクラスタへ割り当て（ブロック単位でメモリを抑える）
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, self.block_rows):
+            block = self.vectors[start:start + self.block_rows]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        order = np.argsort(assign, kind='stable')
+        self.centroids = centroids
+        self._ivf_vectors = self.vectors[order]
+        self._ivf_rows = order
+        self._list_offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+
+    def search(self, queries: np.ndarray, k: int = 5) -> List[List[Tuple[int, float]]]:
+        """各クエリについて (問題ID, コサイン類似度) を類似度の高い順に最大 k 件返す"""
+        queries = normalize_rows(queries)
+        k = min(k, len(self.ids))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        with SEARCH_LATENCY.labels(self.mode).time():
+            if self.mode == 'ivf':
+                scores, rows = self._search_ivf(queries, k)
+            else:
+                scores, rows = self._search_exact(queries, k)
+
+        results = []
+        for row_scores, row_ids in zip(scores, rows):
+            order = np.argsort(-row_scores)
+            results.append([(int(self.ids[r]), float(s))
+                            for s, r in zip(row_scores[order], row_ids[order]) if r >= 0])
+        return results
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ブロックごとの行列積で全件を走査"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.vectors), self.block_rows):
+            block = self.vectors[start:start + self.block_rows]
+            scores = queries @ block.T
+            rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_scores, best_rows = _merge_top_k(best_scores, best_rows, scores, rows, k)
+        return best_scores, best_rows
+
+    def _search_ivf(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """近いクラスタ nprobe 個だけを走査（近似）"""
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for q, clusters in enumerate(probes):
+            candidates = np.concatenate([
+                np.arange(self._list_offsets[c], self._list_offsets[c + 1]) for c in clusters
+            ])
+            if not len(candidates):
+                continue
+            scores = self._ivf_vectors[candidates] @ queries[q]
+            top = min(k, len(candidates))
+            keep = np.argpartition(-scores, top - 1)[:top]
+            all_scores[q, :top] = scores[keep]
+            all_rows[q, :top] = self._ivf_rows[candidates[keep]]
+        return all_scores, all_rows
+
+
+def index_from_env(ids: Sequence[int], vectors: np.ndarray, normalized: bool = False) -> ReferenceIndex:
+    """QUIZ_REFERENCE_INDEX（auto / exact / ivf）と QUIZ_INDEX_NPROBE を使ってインデックスを作成"""
+    return ReferenceIndex(
+        ids, vectors,
+        mode=os.environ.get('QUIZ_REFERENCE_INDEX', 'auto'),
+        nprobe=int(os.environ.get('QUIZ_INDEX_NPROBE', '8')),
+        normalized=normalized,
+    )
@@ -0,0 +1,224 @@
+"""
+Resilience Layer for Remote Translators
+外部翻訳APIの呼び出しを、サーキットブレーカー・ジッター付きバックオフ・ヘッジ要求・期限で保護する
+
+- 期限（QUIZ_TRANSLATE_DEADLINE_S）を過ぎたら待たずにローカルのフォールバック翻訳を返す
+- 直近の失敗率が閾値を超えるとブレーカーが開き、一定時間は外部APIを呼ばずにフォールバックする
+- 連続失敗後はジッター付き指数バックオフの間だけ外部APIを避ける（スレッドを sleep させない）
+- QUIZ_HEDGE_AFTER_S を設定すると、応答が遅い・失敗した場合に2本目の要求を並行して送る
+
+障害を注入したスタブサーバーでの確認:
+    python fault_stub_server.py drill --error-rate 0.3 --slow-rate 0.1
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+import tracing
+from metrics import REGISTRY
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    'quiz_circuit_state', 'Circuit breaker state per backend (0=closed, 1=half-open, 2=open)', ['backend'])
+REMOTE_OUTCOMES = REGISTRY.counter(
+    'quiz_remote_call_outcomes_total',
+    'Protected remote calls by outcome (success, hedged_success, short_circuit, deadline, error)',
+    ['backend', 'outcome'])
+HEDGED_REQUESTS = REGISTRY.counter(
+    'quiz_hedged_requests_total', 'Second requests sent because the first was slow or failed', ['backend'])
+
+
+class CircuitBreaker:
+    """直近 window 件の失敗率で開閉するサーキットブレーカー"""
+
+    def __init__(self, name: str, failure_rate: float = 0.5, window: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, base_backoff: float = 0.05, max_backoff: float = 2.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._results = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._open_until = 0.0
+        self._retry_after = 0.0
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        self._gauge = CIRCUIT_STATE.labels(name)
+        self._gauge.set(0)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            tracing.warning("[CIRCUIT] %s: %s -> %s", self.name, self._state, state)
+            self._state = state
+            self._gauge.set(_STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        """外部APIを呼んでよいか（開いている間・バックオフ中は False）"""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN:
+                if now < self._open_until:
+                    return False
+                self._set_state(HALF_OPEN)
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN:
+                # 半開状態では試験的な1件だけを通す
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+                return True
+            return now >= self._retry_after
+
+    def record_success(self):
+        with self._lock:
+            self._results.append(True)
+            self._consecutive_failures = 0
+            self._retry_after = 0.0
+            if self._state == HALF_OPEN:
+                self._results.clear()
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self._results.append(False)
+            self._consecutive_failures += 1
+            # full jitter: 0〜min(max, base * 2^n) の一様乱数
+            ceiling = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_failures - 1))
+            self._retry_after = now + random.uniform(0, ceiling)
+
+            if self._state == HALF_OPEN:
+                self._trip(now)
+                return
+            failures = self._results.count(False)
+            if len(self._results) >= self.min_calls and failures / len(self._results) >= self.failure_rate:
+                self._trip(now)
+
+    def _trip(self, now: float):
+        # 複数ワーカーが同時に復帰を試みないよう開放時間にもジッターを加える
+        self._open_until = now + self.open_seconds * random.uniform(0.8, 1.2)
+        self._probe_in_flight = False
+        self._set_state(OPEN)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = len(self._results)
+            failures = self._results.count(False)
+        return {
+            'state': self._state,
+            'window_calls': calls,
+            'window_failure_rate': failures / calls if calls else 0.0,
+            'consecutive_failures': self._consecutive_failures,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(backend: str) -> CircuitBreaker:
+    """バックエンドごとにプロセスで共有するブレーカー（QUIZ_BREAKER_* で調整）"""
+    with _breakers_lock:
+        breaker = _breakers.get(backend)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                backend,
+                failure_rate=float(os.environ.get('QUIZ_BREAKER_FAILURE_RATE', '0.5')),
+                window=int(os.environ.get('QUIZ_BREAKER_WINDOW', '20')),
+                open_seconds=float(os.environ.get('QUIZ_BREAKER_OPEN_S', '30')),
+            )
+            _breakers[backend] = breaker
+        return breaker
+
+
+def default_deadline() -> float:
+    """1回の翻訳に使える時間（秒）"""
+    return float(os.environ.get('QUIZ_TRANSLATE_DEADLINE_S', '5'))
+
+
+def default_hedge_after() -> Optional[float]:
+    """ヘッジ要求を送るまでの待ち時間（秒、未設定ならヘッジしない）"""
+    value = os.environ.get('QUIZ_HEDGE_AFTER_S')
+    return float(value) if value else None
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _submit(fn: Callable, *args) -> Future:
+    """外部呼び出しを専用スレッドで実行（呼び出し元は期限までしか待たない）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.environ.get('QUIZ_REMOTE_WORKERS', '16'))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-remote')
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def call_protected(backend: str, fn: Callable, *args, fallback: Callable[[], str],
+                   is_valid: Optional[Callable] = None, deadline: Optional[float] = None,
+                   hedge_after: Optional[float] = None):
+    """
+    fn(*args) をブレーカー・期限・ヘッジ付きで実行し、だめなら fallback() を返す
+
+    期限切れで見捨てた要求はバックグラウンドで完了まで走りますが、結果は使いません。
+    """
+    breaker = breaker_for(backend)
+    if not breaker.allow():
+        REMOTE_OUTCOMES.labels(backend, 'short_circuit').inc()
+        return fallback()
+
+    deadline = default_deadline() if deadline is None else deadline
+    hedge_after = default_hedge_after() if hedge_after is None else hedge_after
+    expires = time.monotonic() + deadline
+
+    pending = {_submit(fn, *args)}
+    hedged = False
+    while pending:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(remaining, hedge_after) if hedge_after is not None and not hedged else remaining
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                tracing.warning("[REMOTE] %s call failed: %s", backend, e)
+                continue
+            if is_valid is None or is_valid(result):
+                for other in pending:
+                    other.cancel()
+                breaker.record_success()
+                REMOTE_OUTCOMES.labels(backend, 'hedged_success' if hedged else 'success').inc()
+                return result
+            tracing.debug("[REMOTE] %s returned an invalid result: %r", backend, result)
+
+        # 1本目が遅い・失敗した場合に、もう1本だけ並行して送る（sleep による再試行はしない）
+        if hedge_after is not None and not hedged:
+            hedged = True
+            HEDGED_REQUESTS.labels(backend).inc()
+            pending.add(_submit(fn, *args))
+
+    breaker.record_failure()
+    REMOTE_OUTCOMES.labels(backend, 'deadline' if pending else 'error').inc()
+    return fallback()
@@ -0,0 +1,43 @@
+"""
+Cross-user Scoring Result Memo
+(問題ID, 正規化した日本語回答, 採点設定バージョン) をキーにした採点結果のLRUキャッシュ
+
+同じ問題に同じ回答が提出された場合、翻訳・類似度計算を省略して保存済みの結果を返します。
+プロセス内の全セッションで共有されます。
+"""
+import os
+import re
+import unicodedata
+
+from bounded_lru import BoundedLRU
+
+
+def normalize_japanese_answer(text: str) -> str:
+    """全角/半角・空白の揺れを吸収した回答文字列"""
+    text = unicodedata.normalize('NFKC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class ScoringResultMemo(BoundedLRU):
+    """上限付きLRUの採点結果メモ（ヒット率を計測、シード済みの設定バージョンを記録）"""
+
+    def __init__(self, max_entries: int = 10000, name: str = 'result_memo'):
+        super().__init__(max_entries, name)
+        self._seeded = set()
+
+    def mark_seeded(self, config_version: str) -> bool:
+        """この設定バージョンで未シードなら True を返して登録（シードはプロセスで一度だけ）"""
+        with self._lock:
+            if config_version in self._seeded:
+                return False
+            self._seeded.add(config_version)
+            return True
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._seeded.clear()
+
+
+# プロセス全体で共有するメモ（QUIZ_RESULT_MEMO_SIZE=0 で無効化）
+RESULT_MEMO = ScoringResultMemo(int(os.environ.get('QUIZ_RESULT_MEMO_SIZE', '10000')))
@@ -0,0 +1,267 @@
+"""
+Shared-memory Reference Embedding Matrix
+正解英文の埋め込み行列と問題IDを共有メモリに一度だけ公開し、各ワーカーがコピーせずに参照する
+
+コーディネーター（問題バンク更新のたびに実行）:
+    python shared_reference_store.py publish --name quiz-refs
+
+ワーカー:
+    QUIZ_SHARED_REFERENCES=quiz-refs streamlit run app.py
+
+セグメント構成:
+    {name}-ctl      int64 の世代番号（8 bytes）
+    {name}-g{世代}  [rows:int64][dim:int64][ids:int64 × rows][正解英文のハッシュ:int64 × rows]
+                    [L2正規化済み float32 行列 rows × dim]
+
+各行には正解英文（クリーニング済み）のハッシュを保存し、ワーカーは自分の問題バンクの
+正解英文と一致する行だけを使います（問題バンク更新の前後で別の英文と組み合わせないため）。
+
+新しい世代を公開すると制御セグメントの世代番号が更新され、ワーカーは次の参照時に
+新しいセグメントへ付け替えます。直前の世代は付け替え中のワーカーのために次の公開まで残し、
+それより古い世代は名前だけ削除します。ワーカーが渡したベクトル（ビュー）が残っている間は
+旧世代のマッピングを閉じず、参照が無くなった後の付け替え時に解放します。
+"""
+import argparse
+import hashlib
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vector_similarity import normalize_rows
+
+_I64 = np.dtype('<i8')
+_F32 = np.dtype('<f4')
+_HEADER_ITEMS = 2
+
+
+def _control_name(name: str) -> str:
+    return f"{name}-ctl"
+
+
+def _data_name(name: str, generation: int) -> str:
+    return f"{name}-g{generation}"
+
+
+def text_hash(text: str) -> int:
+    """正解英文の 64bit ハッシュ（プロセス間で同じ値になる）"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
+
+
+class _Segment(shared_memory.SharedMemory):
+    """ビューが残ったまま破棄された場合はマッピングをプロセス終了まで残す（終了時の BufferError を出さない）"""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+
+def _open_segment(segment: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    共有メモリを開く（resource_tracker の管理対象から外す）
+
+    管理対象のままだと、開いたプロセスの終了時にセグメントが削除されてしまうため。
+    """
+    try:
+        return _Segment(name=segment, create=create, size=size, track=False)
+    except TypeError:
+        # Python 3.12 以前は track 引数がない
+        shm = _Segment(name=segment, create=create, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class ReferenceStorePublisher:
+    """コーディネーター側: 参照ベクトル行列を新しい世代として公開"""
+
+    def __init__(self, name: str):
+        self.name = name
+        try:
+            self._control = _open_segment(_control_name(name))
+        except FileNotFoundError:
+            self._control = _open_segment(_control_name(name), create=True, size=_I64.itemsize)
+            np.ndarray((1,), dtype=_I64, buffer=self._control.buf)[0] = 0
+        self._generation = np.ndarray((1,), dtype=_I64, buffer=self._control.buf)
+
+    @property
+    def generation(self) -> int:
+        return int(self._generation[0])
+
+    def publish(self, ids: List[int], matrix: np.ndarray, texts: List[str]) -> int:
+        """ids・行列（正規化して保存）・各行の正解英文のハッシュを公開し、新しい世代番号を返す"""
+        ids = np.asarray(ids, dtype=_I64)
+        hashes = np.asarray([text_hash(text) for text in texts], dtype=_I64)
+        matrix = normalize_rows(matrix)
+        rows, dim = matrix.shape
+        if len(ids) != rows or len(hashes) != rows:
+            raise ValueError(f"{len(ids)} ids and {len(hashes)} texts for {rows} vectors")
+
+        previous = self.generation
+        generation = previous + 1
+        size = _I64.itemsize * (_HEADER_ITEMS + 2 * rows) + _F32.itemsize * rows * dim
+        segment = _open_segment(_data_name(self.name, generation), create=True, size=max(size, 1))
+
+        np.ndarray((_HEADER_ITEMS,), dtype=_I64, buffer=segment.buf)[:] = (rows, dim)
+        offset = _I64.itemsize * _HEADER_ITEMS
+        np.ndarray((rows,), dtype=_I64, buffer=segment.buf, offset=offset)[:] = ids
+        offset += _I64.itemsize * rows
+        np.ndarray((rows,), dtype=_I64, buffer=segment.buf, offset=offset)[:] = hashes
+        offset += _I64.itemsize * rows
+        np.ndarray((rows, dim), dtype=_F32, buffer=segment.buf, offset=offset)[:] = matrix
+        segment.close()
+
+        # 書き込み完了後に世代を切り替える
+        self._generation[0] = generation
+
+        # 直前の世代は付け替え中のワーカーのために残し、その前の世代を削除
+        if previous > 1:
+            self._unlink(_data_name(self.name, previous - 1))
+
+        print(f"[SHARED REFS] Published generation {generation}: {rows} x {dim} vectors as '{self.name}'")
+        return generation
+
+    def remove(self):
+        """全セグメントを削除"""
+        generation = self.generation
+        self._generation = None
+        self._control.close()
+        for old in (generation - 1, generation):
+            if old > 0:
+                self._unlink(_data_name(self.name, old))
+        self._unlink(_control_name(self.name))
+
+    @staticmethod
+    def _unlink(segment: str):
+        """セグメントを削除（resource_tracker への登録・解除は unlink の1回と対にする）"""
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name=segment, track=False)
+            except TypeError:
+                # Python 3.12 以前: 開くと登録され、unlink で1回だけ解除される
+                shm = shared_memory.SharedMemory(name=segment)
+        except FileNotFoundError:
+            return
+        shm.close()
+        shm.unlink()
+
+
+class SharedReferenceStore:
+    """ワーカー側: 共有メモリ上の参照ベクトルをゼロコピーの NumPy ビューとして参照"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._control = _open_segment(_control_name(name))
+        self._generation_view = np.ndarray((1,), dtype=_I64, buffer=self._control.buf)
+        self.generation = 0
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._retired: List[shared_memory.SharedMemory] = []
+        self.ids = np.zeros(0, dtype=_I64)
+        self.hashes = np.zeros(0, dtype=_I64)
+        self.matrix = np.zeros((0, 0), dtype=_F32)
+        self.index: Dict[int, int] = {}
+        self.refresh()
+
+    def refresh(self, attempts: int = 3) -> bool:
+        """世代が進んでいれば付け替える（付け替えたら True）"""
+        for _ in range(attempts):
+            generation = int(self._generation_view[0])
+            if generation == self.generation or generation == 0:
+                if self._retired:
+                    self._close_retired()
+                return False
+            try:
+                segment = _open_segment(_data_name(self.name, generation))
+            except FileNotFoundError:
+                # 開く前にさらに新しい世代が公開され削除された: 世代を読み直して再試行
+                continue
+            return self._attach(segment, generation)
+        # 付け替えられなければ今の世代のまま（マッピングは有効）
+        return False
+
+    def _attach(self, segment: shared_memory.SharedMemory, generation: int) -> bool:
+        # np.frombuffer のビューはバッファを保持するため、ビュー（とそこから切り出した行）が
+        # 残っている間は segment.close() が BufferError になり、マッピングが解除されない
+        rows, dim = (int(v) for v in np.frombuffer(segment.buf, dtype=_I64, count=_HEADER_ITEMS))
+        offset = _I64.itemsize * _HEADER_ITEMS
+        ids = np.frombuffer(segment.buf, dtype=_I64, count=rows, offset=offset)
+        offset += _I64.itemsize * rows
+        hashes = np.frombuffer(segment.buf, dtype=_I64, count=rows, offset=offset)
+        offset += _I64.itemsize * rows
+        matrix = np.frombuffer(segment.buf, dtype=_F32, count=rows * dim, offset=offset).reshape(rows, dim)
+        for view in (ids, hashes, matrix):
+            view.flags.writeable = False
+
+        if self._segment is not None:
+            self._retired.append(self._segment)
+        self.ids, self.hashes, self.matrix = ids, hashes, matrix
+        self.index = {int(question_id): row for row, question_id in enumerate(ids)}
+        self._segment = segment
+        self.generation = generation
+        self._close_retired()
+        return True
+
+    def _close_retired(self):
+        """旧世代のマッピングを解放（呼び出し元がまだビューを持っていれば次回に持ち越す）"""
+        still_open = []
+        for segment in self._retired:
+            try:
+                segment.close()
+            except BufferError:
+                still_open.append(segment)
+        self._retired = still_open
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    def vector(self, question_id: int, text: str) -> Optional[np.ndarray]:
+        """問題IDの正規化済み参照ベクトル（無い、または正解英文が一致しなければ None）"""
+        row = self.index.get(question_id)
+        if row is None or int(self.hashes[row]) != text_hash(text):
+            return None
+        return self.matrix[row]
+
+    def matches(self, texts_by_id: Dict[int, str]) -> bool:
+        """公開された行が texts_by_id（問題ID → 正解英文）と過不足なく一致するか"""
+        if len(self.ids) != len(texts_by_id):
+            return False
+        return all(int(question_id) in texts_by_id and int(digest) == text_hash(texts_by_id[int(question_id)])
+                   for question_id, digest in zip(self.ids, self.hashes))
+
+
+def publish_question_bank(name: str, embeddings_backend: Optional[str] = None) -> int:
+    """問題バンクの正解英文を埋め込んで公開"""
+    from japanese_to_english_system import JapaneseToEnglishSystem
+
+    system = JapaneseToEnglishSystem(embeddings_backend=embeddings_backend)
+    if not system.use_embeddings:
+        raise RuntimeError("embedding model not available; cannot publish reference vectors")
+
+    questions = system.sample_questions
+    texts = [system._clean_english_text(q['english_reference']) for q in questions]
+    matrix = system.embeddings.encode(texts)
+    return ReferenceStorePublisher(name).publish([q['id'] for q in questions], matrix, texts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Shared-memory reference embeddings")
+    sub = parser.add_subparsers(dest='command', required=True)
+    publish = sub.add_parser('publish', help="問題バンクを埋め込んで新しい世代を公開")
+    publish.add_argument('--name', default='quiz-refs')
+    publish.add_argument('--embeddings', default=None, help="埋め込みバックエンド（ワーカーと揃える）")
+    remove = sub.add_parser('remove', help="共有メモリを削除")
+    remove.add_argument('--name', default='quiz-refs')
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish':
+        publish_question_bank(args.name, args.embeddings)
+    else:
+        ReferenceStorePublisher(args.name).remove()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Single-flight Request Coalescing
+同じキーの処理が実行中なら新たに実行せず、その結果を共有する（翻訳・encode の重複呼び出しを防ぐ）
+
+クラス全員が同じ問題に同時に回答した場合など、キャッシュが埋まる前に届く
+同一の要求を1回の計算にまとめます。QUIZ_SINGLE_FLIGHT=0 で無効化できます。
+"""
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List
+
+import numpy as np
+
+from metrics import REGISTRY
+from vector_similarity import EncoderSimilarity
+
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    'quiz_single_flight_calls_total',
+    'Coalesced calls by group and role (leader computed, shared reused an in-flight result)',
+    ['group', 'role'])
+
+
+def single_flight_enabled_by_default() -> bool:
+    """環境変数 QUIZ_SINGLE_FLIGHT（デフォルト有効）"""
+    return os.environ.get('QUIZ_SINGLE_FLIGHT', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+class SingleFlight:
+    """キーごとに実行中の計算を1つに制限し、同時に来た呼び出しへ同じ結果を返す"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.deduplicated = 0
+        self._leader_counter = SINGLE_FLIGHT_CALLS.labels(name, 'leader')
+        self._shared_counter = SINGLE_FLIGHT_CALLS.labels(name, 'shared')
+
+    def do(self, key: Hashable, fn: Callable, *args):
+        """key の計算が実行中なら完了を待って結果（または例外）を共有、無ければ fn(*args) を実行"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            self._shared_counter.inc()
+            return future.result()
+
+        self._leader_counter.inc()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {'leaders': self.leaders, 'deduplicated': self.deduplicated, 'in_flight': in_flight}
+
+
+# プロセス全体で共有するグループ（セッションごとの翻訳器・クライアントをまたいでまとめる）
+TRANSLATE_FLIGHTS = SingleFlight('translate')
+ENCODE_FLIGHTS = SingleFlight('encode')
+
+
+def translator_key(translator) -> Hashable:
+    """翻訳結果を共有してよい翻訳器の識別子（flight_key が無ければインスタンスごと）"""
+    key = getattr(translator, 'flight_key', None)
+    return key if key is not None else (type(translator).__name__, id(translator))
+
+
+def coalesced_translate(translator, japanese_text: str) -> str:
+    """同じ設定の翻訳器・同じ日本語の翻訳をまとめて実行"""
+    if not single_flight_enabled_by_default():
+        return translator.translate(japanese_text)
+    return TRANSLATE_FLIGHTS.do((translator_key(translator), japanese_text), translator.translate, japanese_text)
+
+
+class CoalescingEmbeddings(EncoderSimilarity):
+    """埋め込みモデルの encode を単一実行にまとめるラッパー（同じインターフェース）"""
+
+    def __init__(self, embeddings, name: str):
+        self.embeddings = embeddings
+        self.name = name
+        self.dimension = embeddings.dimension
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """複数の英文をベクトル化（結果は共有されるため変更しないこと）"""
+        return ENCODE_FLIGHTS.do((self.name, tuple(texts)), self.embeddings.encode, list(texts))
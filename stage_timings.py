@@ -0,0 +1,143 @@
+"""
+Per-stage Latency Timings
+採点パイプラインのステージ別レイテンシ計測と集計
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+# 表示順（translate → clean → 各指標 → total）
+STAGES = ('translate', 'clean', 'word', 'string', 'structure', 'vector', 'total')
+
+
+def timings_enabled_by_default() -> bool:
+    """環境変数 QUIZ_COLLECT_TIMINGS でステージ計測を有効化"""
+    return os.environ.get('QUIZ_COLLECT_TIMINGS', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """ソート済みリストのパーセンタイル（線形補間）"""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+class StageTimer:
+    """単調時計（perf_counter）でステージごとの経過時間を記録"""
+
+    enabled = True
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._last = self._start
+        self.stages: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        """前回の lap からの経過時間を stage に加算"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def finish(self) -> Dict[str, float]:
+        """total を確定してミリ秒の辞書を返す"""
+        self.stages['total'] = time.perf_counter() - self._start
+        return {stage: seconds * 1000 for stage, seconds in self.stages.items()}
+
+
+class _NullTimer:
+    """計測無効時のダミー（呼び出しコストのみ）"""
+
+    enabled = False
+    stages: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        pass
+
+    def finish(self) -> Dict[str, float]:
+        return {}
+
+
+NULL_TIMER = _NullTimer()
+
+
+class StageTimingAggregator:
+    """プロセス全体のステージ別レイテンシ集計（直近 window 件でパーセンタイルを算出）"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent: Dict[str, deque] = {}
+        self._count: Dict[str, int] = {}
+        self._sum: Dict[str, float] = {}
+        self._max: Dict[str, float] = {}
+
+    def record(self, timings_ms: Dict[str, float]):
+        """1回分のタイミング（ミリ秒）を追加"""
+        with self._lock:
+            for stage, value in timings_ms.items():
+                if stage not in self._recent:
+                    self._recent[stage] = deque(maxlen=self.window)
+                    self._count[stage] = 0
+                    self._sum[stage] = 0.0
+                    self._max[stage] = 0.0
+                self._recent[stage].append(value)
+                self._count[stage] += 1
+                self._sum[stage] += value
+                if value > self._max[stage]:
+                    self._max[stage] = value
+
+    def summary(self) -> Dict[str, Dict]:
+        """ステージ別の統計（ミリ秒）"""
+        with self._lock:
+            snapshot = {stage: sorted(values) for stage, values in self._recent.items()}
+            counts = dict(self._count)
+            sums = dict(self._sum)
+            maxes = dict(self._max)
+
+        ordered = [s for s in STAGES if s in snapshot] + sorted(s for s in snapshot if s not in STAGES)
+        return {
+            stage: {
+                'count': counts[stage],
+                'mean_ms': sums[stage] / counts[stage] if counts[stage] else 0.0,
+                'p50_ms': percentile(snapshot[stage], 50),
+                'p95_ms': percentile(snapshot[stage], 95),
+                'max_ms': maxes[stage],
+            }
+            for stage in ordered
+        }
+
+    def reset(self):
+        """集計をクリア"""
+        with self._lock:
+            self._recent.clear()
+            self._count.clear()
+            self._sum.clear()
+            self._max.clear()
+
+    def format_table(self) -> str:
+        """CLI 表示用のテキスト表"""
+        summary = self.summary()
+        if not summary:
+            return "(no timings recorded)"
+
+        lines = [f"{'stage':<10} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}"]
+        for stage, stats in summary.items():
+            lines.append(
+                f"{stage:<10} {stats['count']:>7} {stats['mean_ms']:>8.2f}ms "
+                f"{stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms {stats['max_ms']:>7.2f}ms"
+            )
+        return "\n".join(lines)
+
+
+# プロセス全体で共有する集計器
+STAGE_TIMINGS = StageTimingAggregator()
+
+
+def new_timer(enabled: bool):
+    """有効なら StageTimer、無効ならダミーを返す"""
+    return StageTimer() if enabled else NULL_TIMER
@@ -0,0 +1,232 @@
+"""
+Startup Profiler
+コールドスタートを import・モデル読み込み・初回推論（ウォームアップ）に分けて計測し、予算を超えたら失敗させる
+
+Usage:
+    python startup_profile.py --output startup.json
+    python startup_profile.py --embeddings distilbert --translators google,marian --budget 90
+    QUIZ_STARTUP_BUDGET_S=60 python startup_profile.py     # コンテナのビルド・起動前チェックに
+
+各段階を順に実行し、累計が予算（--budget / QUIZ_STARTUP_BUDGET_S）を超えた時点で
+残りを実行せずにレポートを書き出して終了コード 1 で終わります。
+1つの段階（from_pretrained など）が止まったままでも、予算の時点で打ち切ります。
+import 時間を正しく測るため、他のモジュールを読み込んでいない新しいプロセスで実行してください。
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+_PROCESS_START = time.perf_counter()
+
+
+def _rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class StartupProfile:
+    """段階ごとの所要時間を記録し、予算を超えたら即座にレポートを書いて終了する"""
+
+    def __init__(self, budget: Optional[float] = None, output: Optional[str] = None):
+        self.budget = budget
+        self.output = output
+        self.phases: List[Dict] = []
+        self.current: Optional[str] = None
+        self._lock = threading.Lock()
+        self._finished = False
+        self._watchdog: Optional[threading.Timer] = None
+        if budget is not None:
+            remaining = budget - (time.perf_counter() - _PROCESS_START)
+            self._watchdog = threading.Timer(max(remaining, 0.0), self._over_budget)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - _PROCESS_START
+
+    def run(self, component: str, phase: str, fn: Callable, *args):
+        """1段階を計測（失敗は記録して None を返す）"""
+        with self._lock:
+            self.current = f"{component}:{phase}"
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        error = None
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                result = fn(*args)
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        record = {
+            'component': component,
+            'phase': phase,
+            'seconds': time.perf_counter() - start,
+            'rss_delta_mb': _rss_mb() - rss_before,
+        }
+        if error:
+            record['error'] = error
+        with self._lock:
+            self.phases.append(record)
+            self.current = None
+        print(f"[STARTUP] {component:<24} {phase:<8} {record['seconds']:8.3f}s"
+              + (f"  ({error})" if error else ""), file=sys.stderr)
+        if self.budget is not None and self.elapsed > self.budget:
+            self._over_budget()
+        return result
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = list(self.phases)
+            current = self.current
+        totals: Dict[str, float] = {}
+        for record in phases:
+            totals[record['phase']] = totals.get(record['phase'], 0.0) + record['seconds']
+        elapsed = self.elapsed
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'total_s': elapsed,
+            'by_phase_s': totals,
+            'phases': phases,
+            'rss_mb': _rss_mb(),
+            'budget_s': self.budget,
+            'within_budget': self.budget is None or elapsed <= self.budget,
+        }
+        if current:
+            report['interrupted_phase'] = current
+        return report
+
+    def write(self) -> Dict:
+        report = self.report()
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if self.output:
+            with open(self.output, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            print(f"[STARTUP] Report written to {self.output}", file=sys.stderr)
+        else:
+            print(payload)
+        return report
+
+    def finish(self) -> Dict:
+        with self._lock:
+            self._finished = True
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        return self.write()
+
+    def _over_budget(self):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        report = self.write()
+        where = report.get('interrupted_phase') or (self.phases[-1]['component'] + ':' + self.phases[-1]['phase'])
+        print(f"[STARTUP] Budget exceeded: {report['total_s']:.2f}s > {self.budget:.2f}s (at {where})",
+              file=sys.stderr)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # 読み込み中のスレッドを待たずに終了
+        os._exit(1)
+
+
+def _import(name: str):
+    return importlib.import_module(name)
+
+
+def _load_translator(translator_class):
+    translator = translator_class()
+    if not translator.available:
+        raise RuntimeError(f"{translator_class.__name__} is not available")
+    return translator
+
+
+def profile_startup(profile: StartupProfile, embeddings_backend: str, translators: List[str],
+                    warmup_text: str = "人工知能は私たちの生活を変えています。") -> Dict:
+    """import → モデル読み込み → 初回推論 の順に計測"""
+    # import（重いライブラリは個別に、残りはシステム本体としてまとめて）
+    heavy = ['numpy']
+    if embeddings_backend == 'distilbert' or 'marian' in translators:
+        heavy += ['torch', 'transformers']
+    if 'google' in translators:
+        heavy.append('googletrans')
+    for module in heavy:
+        profile.run(module, 'import', _import, module)
+    system_module = profile.run('japanese_to_english_system', 'import', _import, 'japanese_to_english_system')
+    if system_module is None:
+        return profile.finish()
+    system_class = system_module.JapaneseToEnglishSystem
+
+    # モデル読み込み
+    embeddings = profile.run(f"embeddings:{embeddings_backend}", 'load',
+                             system_class._load_embeddings, embeddings_backend)
+    loaded = {}
+    for name in translators:
+        if name == 'google':
+            from google_translator import GoogleTranslator as translator_class
+        elif name == 'marian':
+            from ai_translator import LocalAITranslator as translator_class
+        else:
+            continue
+        loaded[name] = profile.run(f"translator:{name}", 'load', _load_translator, translator_class)
+    # 埋め込みモデルは共有済みのため、init は問題の読み込み・索引・翻訳クライアント
+    # （QUIZ_MODEL_SERVER_SOCKET が無ければ自前の GoogleTranslator）の生成。
+    # 結果メモの事前採点は全問題の翻訳を伴うため、別の段階として計測する
+    system = profile.run('system', 'init', lambda: system_class(
+        embeddings_backend=embeddings_backend, seed_result_memo=False))
+    if system is not None:
+        profile.run('system', 'seed_memo', system._seed_result_memo)
+
+    # 初回推論（2回目との差がウォームアップの費用）
+    if embeddings is not None:
+        english = system_class.translate_japanese_to_english_mock(warmup_text)
+        profile.run(f"embeddings:{embeddings_backend}", 'warmup', embeddings.encode, [english])
+        profile.run(f"embeddings:{embeddings_backend}", 'steady', embeddings.encode, [english + " today"])
+    for name, translator in loaded.items():
+        if translator is not None:
+            profile.run(f"translator:{name}", 'warmup', translator.translate, warmup_text)
+            profile.run(f"translator:{name}", 'steady', translator.translate, warmup_text + "今日")
+    if system is not None:
+        system.current_question = system.sample_questions[0]
+        profile.run('system', 'warmup', system.score_translation, warmup_text)
+    return profile.finish()
+
+
+def budget_from_env() -> Optional[float]:
+    """環境変数 QUIZ_STARTUP_BUDGET_S（未設定なら予算なし）"""
+    value = os.environ.get('QUIZ_STARTUP_BUDGET_S')
+    return float(value) if value else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile cold start and enforce a startup budget")
+    parser.add_argument('--embeddings', default=os.environ.get('QUIZ_EMBEDDINGS_BACKEND', 'distilbert'),
+                        choices=['distilbert', 'static', 'none'])
+    parser.add_argument('--translators', default='google', help="読み込む翻訳器（カンマ区切り、google / marian）")
+    parser.add_argument('--budget', type=float, default=None, help="起動の予算（秒、省略時は QUIZ_STARTUP_BUDGET_S）")
+    parser.add_argument('--output', default=None, help="JSON の出力先（省略時は標準出力）")
+    args = parser.parse_args(argv)
+
+    budget = args.budget if args.budget is not None else budget_from_env()
+    translators = [t.strip() for t in args.translators.split(',') if t.strip()]
+    profile = StartupProfile(budget, args.output)
+    report = profile_startup(profile, args.embeddings, translators)
+    if not report['within_budget']:
+        print(f"[STARTUP] Budget exceeded: {report['total_s']:.2f}s > {budget:.2f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
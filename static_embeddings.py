@@ -0,0 +1,138 @@
+"""
+Static Word-vector Embeddings
+メモリマップした float16 の静的単語ベクトルによる軽量な英文埋め込み
+
+EnglishEmbeddings と同じ encode / calculate_similarity インターフェースを持ち、
+NumPy のみで動作します（torch / transformers 不要）。
+
+ベクトルの準備（GloVe などのテキスト形式から変換）:
+    python static_embeddings.py build glove.6B.300d.txt vectors/ --max-words 50000
+
+ディレクトリ構成:
+    vectors.f16.npy   (語彙数 × 次元) の float16 行列
+    vocab.txt         1行1語「単語<TAB>出現頻度」（頻度は SIF 重みに使用）
+"""
+import argparse
+import os
+import re
+import sys
+from typing import List, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+from vector_similarity import EncoderSimilarity
+
+VECTORS_FILE = 'vectors.f16.npy'
+VOCAB_FILE = 'vocab.txt'
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+STATIC_ENCODE_LATENCY = REGISTRY.histogram(
+    'quiz_static_embedding_encode_seconds', 'StaticWordEmbeddings.encode latency per call')
+
+
+class StaticWordEmbeddings(EncoderSimilarity):
+    """静的単語ベクトルの平均（SIF 重み付き）による英文埋め込み"""
+
+    def __init__(self, vectors_dir: Optional[str] = None, pooling: str = 'sif', sif_a: float = 1e-3):
+        vectors_dir = vectors_dir or os.environ.get('QUIZ_STATIC_VECTORS_DIR', 'static_vectors')
+        print(f"[LOADING] Static word vectors from {vectors_dir}...")
+
+        # mmap なので実際に参照した行だけが常駐する
+        self.vectors = np.load(os.path.join(vectors_dir, VECTORS_FILE), mmap_mode='r')
+        self.dimension = self.vectors.shape[1]
+
+        self.word_index = {}
+        counts = []
+        with open(os.path.join(vectors_dir, VOCAB_FILE), encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                word, _, count = line.rstrip('\n').partition('\t')
+                self.word_index[word] = i
+                counts.append(float(count) if count else 0.0)
+
+        if len(self.word_index) != self.vectors.shape[0]:
+            raise ValueError(
+                f"vocab.txt has {len(self.word_index)} words but vectors have {self.vectors.shape[0]} rows")
+
+        # SIF 重み a / (a + p(w))：頻出語（the, is など）の影響を下げる
+        counts = np.asarray(counts, dtype=np.float64)
+        if pooling == 'sif' and counts.sum() > 0:
+            self.weights = (sif_a / (sif_a + counts / counts.sum())).astype(np.float32)
+        else:
+            self.weights = np.ones(len(counts), dtype=np.float32)
+        self.pooling = pooling
+
+        print(f"[SUCCESS] Static word vectors loaded ({len(self.word_index)} words, {self.dimension} dimensions, {pooling} pooling)")
+
+    def _token_ids(self, text: str) -> List[int]:
+        index = self.word_index
+        return [index[token] for token in _TOKEN_PATTERN.findall(text.lower()) if token in index]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """複数の英文をベクトル化（未知語のみの文はゼロベクトル）"""
+        with STATIC_ENCODE_LATENCY.time():
+            embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+            for row, text in enumerate(texts):
+                ids = self._token_ids(text)
+                if not ids:
+                    continue
+                weights = self.weights[ids]
+                vectors = self.vectors[ids].astype(np.float32)
+                embeddings[row] = weights @ vectors / weights.sum()
+            return embeddings
+
+
+def build_static_vectors(source_path: str, out_dir: str, max_words: int = 50000,
+                         lowercase: bool = True) -> int:
+    """
+    GloVe / word2vec テキスト形式（1行「単語 v1 v2 ...」、頻度順）から変換
+
+    頻度情報を持たない形式のため、出現順位から Zipf 則で頻度を近似します。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    words, rows = [], []
+    seen = set()
+
+    with open(source_path, encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            parts = line.rstrip().split(' ')
+            if len(parts) < 3:
+                continue  # word2vec のヘッダ行
+            word = parts[0].lower() if lowercase else parts[0]
+            if word in seen or not _TOKEN_PATTERN.fullmatch(word):
+                continue
+            seen.add(word)
+            words.append(word)
+            rows.append(np.asarray(parts[1:], dtype=np.float32))
+            if len(words) >= max_words:
+                break
+
+    matrix = np.vstack(rows).astype(np.float16)
+    np.save(os.path.join(out_dir, VECTORS_FILE), matrix)
+
+    with open(os.path.join(out_dir, VOCAB_FILE), 'w', encoding='utf-8') as f:
+        for rank, word in enumerate(words, 1):
+            f.write(f"{word}\t{1.0 / rank:.10g}\n")
+
+    print(f"[SUCCESS] Wrote {len(words)} x {matrix.shape[1]} float16 vectors to {out_dir}")
+    return len(words)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Static word-vector embeddings tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="GloVe/word2vec テキストから float16 行列と語彙を作成")
+    build.add_argument('source')
+    build.add_argument('out_dir')
+    build.add_argument('--max-words', type=int, default=50000)
+
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build_static_vectors(args.source, args.out_dir, args.max_words)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,8 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from japanese_to_english_system import JapaneseToEnglishSystem
+from result_memo import RESULT_MEMO
+from stage_timings import STAGE_TIMINGS
 
 st.set_page_config(
     page_title="Japanese to English Quiz",
@@ -32,6 +34,10 @@ st.markdown("**新しいアプローチ**: あなたの日本語を英訳して
 # サイドバー：統計情報
 st.sidebar.header("📊 システム情報")
 st.sidebar.metric("📚 利用可能な問題数", len(quiz.sample_questions))
+if RESULT_MEMO.enabled:
+    memo_stats = RESULT_MEMO.stats()
+    st.sidebar.metric("♻️ 採点結果キャッシュ ヒット率", f"{memo_stats['hit_rate'] * 100:.1f}%",
+                      help=f"{memo_stats['entries']}/{memo_stats['max_entries']} 件保持")
 
 stats = quiz.get_statistics()
 if stats:
@@ -48,6 +54,21 @@ if stats:
             if count > 0:
                 st.sidebar.write(f"{grade}: {count}回")
 
+if quiz.collect_timings:
+    timing_summary = STAGE_TIMINGS.summary()
+    if timing_summary:
+        st.sidebar.divider()
+        st.sidebar.header("⏱️ ステージ別レイテンシ")
+        st.sidebar.dataframe(
+            {
+                'stage': list(timing_summary.keys()),
+                'p50 (ms)': [round(v['p50_ms'], 2) for v in timing_summary.values()],
+                'p95 (ms)': [round(v['p95_ms'], 2) for v in timing_summary.values()],
+                'count': [v['count'] for v in timing_summary.values()],
+            },
+            hide_index=True
+        )
+
 st.sidebar.divider()
 if st.sidebar.button("🔄 統計をリセット"):
     st.session_state.quiz_system.score_history = []
@@ -92,6 +113,11 @@ with col1:
 
         st.session_state.user_answer = user_answer
 
+        # 入力中のプレビュー（辞書翻訳 + 字句指標のみの目安。正式な採点は「採点する」で実行）
+        if user_answer.strip():
+            preview = quiz.preview_score(user_answer)
+            st.caption(f"👀 プレビュー（目安）: {preview['score']}点 / {preview['grade']} — AIを使った正式なスコアは「採点する」で表示されます")
+
         col_btn1, col_btn2 = st.columns(2)
 
         with col_btn1:
@@ -108,6 +134,19 @@ with col1:
                 st.session_state.show_result = False
                 st.rerun()
 
+    # フリー練習: 任意の日本語を最も近い問題と照合して採点
+    with st.expander("🆓 フリー練習（好きな日本語で練習）", expanded=False):
+        free_answer = st.text_area("✏️ 日本語の文を入力してください:", key="free_form_input", height=100)
+        if st.button("🔍 近い問題を探して採点", disabled=not free_answer.strip()):
+            free_result = quiz.score_free_form(free_answer)
+            if 'japanese_input' in free_result:
+                st.session_state.result = free_result
+                st.session_state.show_result = True
+                st.rerun()
+            else:
+                # 照合できる問題が無いなど、採点できなかった場合
+                st.warning(free_result['feedback'])
+
 with col2:
     st.header("💡 システムの仕組み")
 
@@ -174,6 +213,8 @@ if st.session_state.show_result and st.session_state.result:
         st.info(result['feedback'])
     else:
         st.warning(result['feedback'])
+    if result.get('tier', 'full') != 'full':
+        st.caption(f"🐢 高負荷のため軽量な採点（{result['tier']}）で処理しました")
 
     # 翻訳結果表示
     col_trans1, col_trans2 = st.columns(2)
@@ -188,6 +229,9 @@ if st.session_state.show_result and st.session_state.result:
     with col_trans2:
         st.write("**元の日本語:**")
         st.code(result['question']['japanese'], language="text")
+        if result.get('free_form'):
+            st.caption("🆓 近い問題: " + " / ".join(
+                f"{match['japanese']}（{match['similarity'] * 100:.0f}%）" for match in result['matches']))
 
         st.write("**正解英文:**")
         st.code(result['reference_english'], language="text")
@@ -255,10 +299,15 @@ if st.session_state.show_result and st.session_state.result:
                 weight_parts.append(f"単語{weights.get('word', 0)*100:.0f}%")
                 weight_parts.append(f"文字列{weights.get('string', 0)*100:.0f}%")
                 weight_parts.append(f"構造{weights.get('structure', 0)*100:.0f}%")
+                if weights.get('japanese', 0) > 0:
+                    weight_parts.append(f"日本語{weights.get('japanese', 0)*100:.0f}%")
 
                 weight_text += " + ".join(weight_parts)
                 st.info(weight_text)
 
+            if details.get('skipped_metrics'):
+                st.caption(f"⚡ カスケード採点で省略した指標（範囲の中央値で推定）: {', '.join(details['skipped_metrics'])}")
+
             # 単語分析
             if 'word_details' in details:
                 word_details = details['word_details']
@@ -337,6 +386,9 @@ if st.session_state.show_result and st.session_state.result:
                     st.write(f"• 単語類似寄与: {word_contribution:.1f}点")
                     st.write(f"• 文字列寄与: {string_contribution:.1f}点")
                     st.write(f"• 構造類似寄与: {structure_contribution:.1f}点")
+                    if weights.get('japanese', 0) > 0:
+                        japanese_contribution = details.get('japanese_similarity', 0) * weights.get('japanese', 0) * 100
+                        st.write(f"• 日本語一致寄与: {japanese_contribution:.1f}点")
 
             # 改善提案
             st.divider()
@@ -0,0 +1,77 @@
+"""
+Tokenization Cache
+英文のトークンIDを (トークナイザー名, 英文) ごとに保持し、encode 時のトークナイズを省略する
+
+- 問題バンクに保存された正解英文のトークンID（python question_bank.py tokenize で作成）は固定で保持
+- 最近の回答英文は上限付きLRU（QUIZ_TOKENIZE_CACHE_SIZE、0 で無効）に保持
+プロセス内の全セッションで共有されます。
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from metrics import REGISTRY
+from bounded_lru import CACHE_REQUESTS, BoundedLRU
+
+TOKENIZED_TEXTS = REGISTRY.counter(
+    'quiz_tokenized_texts_total', 'Texts passed to the tokenizer because they were not cached')
+
+
+class TokenizationCache:
+    """事前計算済みの正解英文 + 最近の英文の LRU"""
+
+    def __init__(self, max_entries: int = 4096, name: str = 'tokenize'):
+        self.name = name
+        self._pinned: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+        self._recent = BoundedLRU(max_entries, name)
+        self._pinned_counter = CACHE_REQUESTS.labels(name, 'pinned')
+
+    def pin(self, tokenizer_name: str, text: str, input_ids: List[int]):
+        """事前にトークナイズした英文を登録（LRU から追い出されない）"""
+        with self._lock:
+            self._pinned[(tokenizer_name, text)] = list(input_ids)
+
+    def tokenize(self, tokenizer_name: str, tokenize_fn: Callable[[List[str]], List[List[int]]],
+                 texts: Sequence[str]) -> List[List[int]]:
+        """キャッシュに無い英文だけを tokenize_fn でまとめてトークナイズし、入力順のトークンIDを返す"""
+        token_ids: List = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for row, text in enumerate(texts):
+            key = (tokenizer_name, text)
+            ids = self._pinned.get(key)
+            if ids is not None:
+                self._pinned_counter.inc()
+            else:
+                ids = self._recent.get(key)
+            if ids is None:
+                missing.setdefault(text, []).append(row)
+            else:
+                token_ids[row] = ids
+
+        if missing:
+            TOKENIZED_TEXTS.inc(len(missing))
+            for text, ids in zip(missing, tokenize_fn(list(missing))):
+                self._recent.put((tokenizer_name, text), ids)
+                for row in missing[text]:
+                    token_ids[row] = ids
+        return token_ids
+
+    def stats(self) -> Dict:
+        return {'pinned': len(self._pinned), **self._recent.stats()}
+
+
+# プロセス全体で共有するキャッシュ
+TOKENIZATION_CACHE = TokenizationCache(int(os.environ.get('QUIZ_TOKENIZE_CACHE_SIZE', '4096')))
+
+
+def pin_reference_tokens(questions: List[Dict], clean: Callable[[str], str]) -> int:
+    """問題バンクの reference_tokens（正解英文のトークンID）をキャッシュに登録し、件数を返す"""
+    pinned = 0
+    for question in questions:
+        tokens = question.get('reference_tokens')
+        if not tokens:
+            continue
+        TOKENIZATION_CACHE.pin(tokens['tokenizer'], clean(question['english_reference']), tokens['input_ids'])
+        pinned += 1
+    return pinned
@@ -0,0 +1,223 @@
+"""
+Leveled Structured Tracing
+リクエスト単位のスパンとレベル付き構造化ログ（キュー経由の非同期出力）
+
+環境変数:
+    QUIZ_TRACE_LEVEL   DEBUG / INFO / WARNING / ERROR / OFF（デフォルト: WARNING）
+    QUIZ_TRACE_SAMPLE  DEBUG/INFO を出力するリクエストの割合 0.0〜1.0（デフォルト: 1.0）
+    QUIZ_TRACE_FILE    出力先ファイル（省略時は stderr）
+
+デフォルトの WARNING ではリクエストごとの出力は一切ありません。
+イベントはフォーマット前の状態でキューに積まれ、専用スレッドが JSON Lines で書き出します。
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+_LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR', OFF: 'OFF'}
+_NAME_LEVELS = {name: level for level, name in _LEVEL_NAMES.items()}
+
+
+def _parse_level(value: Optional[str], default: int = WARNING) -> int:
+    if not value:
+        return default
+    value = value.strip().upper()
+    if value.isdigit():
+        return int(value)
+    return _NAME_LEVELS.get(value, default)
+
+
+_level = _parse_level(os.environ.get('QUIZ_TRACE_LEVEL'))
+_sample_rate = float(os.environ.get('QUIZ_TRACE_SAMPLE', '1.0'))
+
+
+class Span:
+    """リクエスト内の処理区間（request_id でトランスレータと採点を関連付け）"""
+
+    __slots__ = ('name', 'request_id', 'sampled', 'start', 'fields', '_token')
+
+    def __init__(self, name: str, request_id: str, sampled: bool, fields: Dict):
+        self.name = name
+        self.request_id = request_id
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.fields = fields
+        self._token = None
+
+    def set(self, **fields):
+        """スパンに属性を追加（終了イベントに含まれる）"""
+        self.fields.update(fields)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('quiz_trace_span', default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.request_id if span else None
+
+
+@contextmanager
+def span(name: str, request_id: Optional[str] = None, **fields):
+    """スパンを開始（親が無ければ新しい request_id を発行しサンプリングを決定）"""
+    parent = _current_span.get()
+    if parent is not None and request_id is None:
+        current = Span(name, parent.request_id, parent.sampled, fields)
+    else:
+        sampled = _sample_rate >= 1.0 or random.random() < _sample_rate
+        current = Span(name, request_id or new_request_id(), sampled, fields)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        if _level <= DEBUG and current.sampled:
+            _emit(DEBUG, current, 'span end', (),
+                  dict(current.fields, duration_ms=round((time.perf_counter() - current.start) * 1000, 3)))
+
+
+def is_enabled(level: int) -> bool:
+    """高コストな引数を組み立てる前のチェック用"""
+    if level < _level:
+        return False
+    if level < WARNING:
+        current = _current_span.get()
+        return current is None or current.sampled
+    return True
+
+
+def debug(msg: str, *args, **fields):
+    if _level <= DEBUG:
+        _log(DEBUG, msg, args, fields)
+
+
+def info(msg: str, *args, **fields):
+    if _level <= INFO:
+        _log(INFO, msg, args, fields)
+
+
+def warning(msg: str, *args, **fields):
+    if _level <= WARNING:
+        _log(WARNING, msg, args, fields)
+
+
+def error(msg: str, *args, **fields):
+    if _level <= ERROR:
+        _log(ERROR, msg, args, fields)
+
+
+def _log(level: int, msg: str, args, fields):
+    current = _current_span.get()
+    if level < WARNING and current is not None and not current.sampled:
+        return
+    _emit(level, current, msg, args, fields)
+
+
+class _QueuedSink:
+    """イベントをキューに積み、専用スレッドでフォーマットして書き出す"""
+
+    def __init__(self, maxsize: int = 10000):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        path = os.environ.get('QUIZ_TRACE_FILE')
+        self._stream = open(path, 'a', encoding='utf-8') if path else sys.stderr
+
+    def put(self, event: tuple):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # 出力が追いつかない場合はリクエストを待たせずに破棄
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-sink", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                self._stream.write(_format_event(event) + "\n")
+                if self._queue.empty():
+                    self._stream.flush()
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 2.0):
+        """キューを書き出し終えるまで待つ（終了時・テスト用）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+def _format_event(event: tuple) -> str:
+    timestamp, level, request_id, span_name, msg, args, fields = event
+    if args:
+        try:
+            msg = msg % args
+        except (TypeError, ValueError):
+            msg = f"{msg} {args}"
+    record = {
+        'ts': round(timestamp, 6),
+        'level': _LEVEL_NAMES.get(level, str(level)),
+        'msg': msg,
+    }
+    if request_id:
+        record['request_id'] = request_id
+    if span_name:
+        record['span'] = span_name
+    if fields:
+        record.update(fields)
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+_sink = _QueuedSink()
+
+
+def _emit(level: int, current: Optional[Span], msg: str, args, fields):
+    _sink.put((time.time(), level,
+               current.request_id if current else None,
+               current.name if current else None,
+               msg, args, fields))
+
+
+def configure(level: Optional[str] = None, sample_rate: Optional[float] = None):
+    """実行時にレベルとサンプリング率を変更"""
+    global _level, _sample_rate
+    if level is not None:
+        _level = _parse_level(level, _level)
+    if sample_rate is not None:
+        _sample_rate = max(0.0, min(1.0, float(sample_rate)))
+
+
+def flush(timeout: float = 2.0):
+    _sink.flush(timeout)
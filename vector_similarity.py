@@ -0,0 +1,57 @@
+"""
+Normalized Vector Similarity
+L2 正規化した float32 ベクトルの行列積で、コサイン類似度を一括計算する
+
+1つの回答と複数の正解英文、複数の回答とそれぞれの問題の正解英文などを、
+ペアごとの Python ループなしに1回の BLAS 行列積で比較します。
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """行ごとに L2 正規化した float32 行列（ゼロベクトルはゼロのまま）"""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_matrix(query_vectors: np.ndarray, reference_vectors: np.ndarray,
+                  references_normalized: bool = False) -> np.ndarray:
+    """(queries, references) のコサイン類似度行列"""
+    queries = normalize_rows(query_vectors)
+    references = reference_vectors if references_normalized else normalize_rows(reference_vectors)
+    return queries @ np.asarray(references, dtype=np.float32).T
+
+
+def encode_similarity_matrix(embeddings, queries: Sequence[str], references: Sequence[str]) -> np.ndarray:
+    """両側の英文を1回の encode でベクトル化し、コサイン類似度行列を返す"""
+    if not queries or not references:
+        return np.zeros((len(queries), len(references)), dtype=np.float32)
+    vectors = embeddings.encode(list(queries) + list(references))
+    return cosine_matrix(vectors[:len(queries)], vectors[len(queries):])
+
+
+class EncoderSimilarity:
+    """
+    encode だけを実装した埋め込みクラスに、類似度系のメソッドを揃える基底クラス
+
+    サブクラスは encode(texts) と dimension を用意します。
+    """
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode_single(self, text: str) -> List[float]:
+        """単一の英文をベクトル化"""
+        return self.encode([text])[0].tolist()
+
+    def similarity_matrix(self, queries: List[str], references: List[str]) -> np.ndarray:
+        """複数の英文と複数の正解英文のコサイン類似度行列（float32、1回の encode と行列積）"""
+        return encode_similarity_matrix(self, queries, references)
+
+    def calculate_similarity(self, text1: str, text2: str) -> float:
+        """2つの英文間のコサイン類似度を計算"""
+        return float(self.similarity_matrix([text1], [text2])[0, 0])